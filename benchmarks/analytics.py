@@ -0,0 +1,128 @@
+"""
+Benchmark de la analítica vectorizada (medias móviles, crecimiento mensual y atípicos).
+
+    $ python benchmarks/analytics.py                   # cálculo sobre 100k, 1M y 5M filas sintéticas
+    $ python benchmarks/analytics.py --rows 2000000 --python
+    $ python benchmarks/analytics.py --rows 200000 --db # incluye la carga desde una base SQLite temporal
+
+--python compara con el mismo cálculo recorriendo filas en Python (solo con tamaños pequeños).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import logging  # noqa: E402
+import numpy as np  # noqa: E402
+from api.analytics import TransactionColumns, analyze, load_columns, SECONDS_PER_DAY  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+
+def synthetic_columns(rows, years=5, seed=42):
+    rng = np.random.default_rng(seed)
+    start = int(datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp())
+    types = rng.integers(0, 2, rows, dtype=np.int8)
+    amounts = np.where(types == 0, rng.lognormal(7, 1, rows), rng.lognormal(6, 1, rows))
+    return TransactionColumns(
+        np.arange(1, rows + 1, dtype=np.int64),
+        np.sort(rng.integers(start, start + years * 365 * SECONDS_PER_DAY, rows)),
+        amounts,
+        types,
+        rng.integers(0, 2, rows, dtype=np.int8),
+    )
+
+
+def python_analyze(columns):
+    """Referencia ingenua: recorre cada transacción como haría transform_for_chart."""
+    daily, monthly, expenses = {}, {}, []
+    for date, amount, kind in zip(columns.dates.tolist(), columns.amounts.tolist(), columns.types.tolist()):
+        moment = datetime.fromtimestamp(date, timezone.utc)
+        day = daily.setdefault(moment.date(), [0.0, 0.0])
+        day[kind] += amount
+        month = monthly.setdefault((moment.year, moment.month), [0.0, 0.0])
+        month[kind] += amount
+        if kind == 1:
+            expenses.append(amount)
+    median = statistics.median(expenses)
+    mad = statistics.median(abs(x - median) for x in expenses)
+    outliers = [x for x in expenses if abs(0.6745 * (x - median) / mad) > 3.5]
+    days = sorted(daily)
+    for window in (30, 90):
+        for i in range(len(days)):
+            window_days = [daily.get(days[i] - timedelta(days=d), [0.0, 0.0]) for d in range(min(window, i + 1))]
+            sum(values[0] for values in window_days)
+    return len(outliers)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def seed_database(rows, db_file):
+    from app import create_app
+    app = create_app("test", SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_file}")
+    from api.models import db, User, Transaction
+    with app.app_context():
+        db.create_all()
+        user = User(name="Bench", company="Bench", email="bench@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        columns = synthetic_columns(rows)
+        batch = []
+        for date, amount, kind, status in zip(columns.dates.tolist(), columns.amounts.tolist(),
+                                              columns.types.tolist(), columns.statuses.tolist()):
+            batch.append({
+                "user_id": user.id, "amount": amount, "description": "x", "company": "ACME",
+                "transaction_type": "expense" if kind else "income", "status": "pending" if status else "completed",
+                "date": datetime.fromtimestamp(date, timezone.utc).replace(tzinfo=None),
+            })
+            if len(batch) == 10000:
+                db.session.execute(db.insert(Transaction.__table__), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Transaction.__table__), batch)
+        db.session.commit()
+        return app, user.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="100000,1000000,5000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--python", action="store_true", help="Comparar con el cálculo fila a fila")
+    parser.add_argument("--db", action="store_true", help="Medir también la carga desde SQLite")
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name if args.db else None
+    try:
+        print(f"{'filas':>10} {'numpy':>10} {'python':>10} {'carga db':>10}")
+        for rows in (int(r) for r in args.rows.split(",")):
+            columns = synthetic_columns(rows)
+            vectorized = timed(lambda: analyze(columns), args.repeat)
+            naive = f"{timed(lambda: python_analyze(columns), 1) * 1000:>8.0f}ms" if args.python else f"{'-':>10}"
+            load = f"{'-':>10}"
+            if args.db:
+                app, user_id = seed_database(rows, db_file)
+                with app.app_context():
+                    load = f"{timed(lambda: load_columns(user_id), args.repeat) * 1000:>8.0f}ms"
+                    from api.models import db
+                    db.drop_all()
+            print(f"{rows:>10} {vectorized * 1000:>8.0f}ms {naive} {load}")
+    finally:
+        if db_file:
+            os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
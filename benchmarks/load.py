@@ -0,0 +1,185 @@
+"""
+Benchmark de carga de punta a punta contra los endpoints reales (login, listados, gráfico y CRUD).
+
+Por defecto crea una base SQLite temporal, la migra, la puebla con `flask seed` y arranca gunicorn
+sobre ella, así que dos ejecuciones con los mismos parámetros son comparables:
+
+    $ python benchmarks/load.py --concurrency 8 --requests 400
+    $ python benchmarks/load.py --scenarios list,chart --seed-users 2 --transactions-per-month 2000
+
+Para medir un servidor ya arrancado (p.ej. con Postgres) se le pasa la URL y un usuario existente:
+
+    $ python benchmarks/load.py --url http://localhost:3001 --email seed_user1@example.com --password 123456
+
+Informa p50/p95/p99 y peticiones por segundo de cada escenario.
+"""
+import os
+import sys
+import time
+import random
+import socket
+import argparse
+import tempfile
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCENARIOS = ("login", "list", "list_page", "chart", "crud")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(args):
+    """Base SQLite temporal migrada y poblada con `flask seed`. Devuelve (entorno, fichero de la base)."""
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    # Gráficos renderizados en local para no medir la latencia de QuickChart
+    env = {"CHART_RENDERER": "local", **os.environ, "DATABASE_URL": f"sqlite:///{db_file}",
+           "FLASK_APP": "src/app.py", "FLASK_DEBUG": "0", "JWT_SECRET_KEY": "benchmark"}
+    quiet = {"cwd": ROOT, "env": env, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    subprocess.run(["flask", "db", "upgrade"], check=True, **quiet)
+    print("Poblando la base de datos…", flush=True)
+    subprocess.run(["flask", "seed", "--users", str(args.seed_users), "--years", str(args.years),
+                    "--transactions-per-month", str(args.transactions_per_month), "--password", args.password],
+                   check=True, **quiet)
+    return env, db_file
+
+
+def start_server(env, workers=None, worker_class=None):
+    """Arranca gunicorn con gunicorn.conf.py (como en producción). Devuelve (url, proceso)."""
+    port = free_port()
+    env = {**env, "GUNICORN_BIND": f"127.0.0.1:{port}"}
+    if workers:
+        env["WEB_CONCURRENCY"] = str(workers)
+    if worker_class:
+        env["GUNICORN_WORKER_CLASS"] = worker_class
+    server = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py", "wsgi", "--chdir", "./src/"], cwd=ROOT,
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            requests.get(url + "/api/login", timeout=5)
+            return url, server
+        except requests.RequestException:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("gunicorn no arrancó")
+
+
+def start_local_server(args):
+    """Base temporal + migraciones + seed + gunicorn. Devuelve (url, proceso, fichero de la base)."""
+    env, db_file = prepare_database(args)
+    url, server = start_server(env, args.workers, args.worker_class)
+    return url, server, db_file
+
+
+def login(session, url, email, password):
+    response = session.post(url + "/api/login", json={"email": email, "password": password}, timeout=30)
+    response.raise_for_status()
+    return {"Authorization": "Bearer " + response.json()["token"]}
+
+
+def run_scenario(name, url, accounts, args):
+    """Ejecuta `args.requests` peticiones del escenario con `args.concurrency` hilos."""
+    per_thread = max(1, args.requests // args.concurrency)
+
+    def worker(index):
+        rng = random.Random(args.random_seed + index)
+        session = requests.Session()
+        email, headers = accounts[index % len(accounts)]
+        timings, errors = {}, {}
+
+        def call(label, method, path, **kwargs):
+            kwargs.setdefault("headers", headers)
+            started = time.perf_counter()
+            response = session.request(method, url + path, timeout=60, **kwargs)
+            timings.setdefault(label, []).append(time.perf_counter() - started)
+            errors[label] = errors.get(label, 0) + (response.status_code >= 400)
+            return response
+
+        for _ in range(per_thread):
+            if name == "login":
+                call("login", "POST", "/api/login", headers={}, json={"email": email, "password": args.password})
+            elif name == "list":
+                call("list", "GET", "/api/transactions")
+            elif name == "list_page":
+                call("list_page", "GET", "/api/transactions?limit=100")
+            elif name == "chart":
+                call("chart", "GET", "/api/chart?granularity=" + rng.choice(["month", "quarter", "week"]))
+            elif name == "crud":
+                created = call("crud_create", "POST", "/api/transactions", json={
+                    "amount": rng.randint(1, 1000), "transaction_type": rng.choice(["income", "expense"]),
+                    "status": "pending"})
+                if created.ok:
+                    transaction_id = created.json()["id"]
+                    call("crud_update", "PUT", f"/api/transactions/{transaction_id}", json={"status": "completed"})
+                    call("crud_delete", "DELETE", f"/api/transactions/{transaction_id}")
+        return timings, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(worker, range(args.concurrency)))
+    wall = time.perf_counter() - started
+
+    merged, errors = {}, {}
+    for timings, worker_errors in results:
+        for label, values in timings.items():
+            merged.setdefault(label, []).extend(values)
+            errors[label] = errors.get(label, 0) + worker_errors.get(label, 0)
+    return merged, errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor ya arrancado; si no se indica se levanta uno local")
+    parser.add_argument("--email", action="append", help="Usuario(s) existentes cuando se usa --url")
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por escenario")
+    parser.add_argument("--workers", type=int, default=2, help="Workers de gunicorn del servidor local")
+    parser.add_argument("--worker-class", choices=("sync", "gthread"), help="Por defecto, el de gunicorn.conf.py")
+    parser.add_argument("--seed-users", type=int, default=4)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--transactions-per-month", type=int, default=200)
+    parser.add_argument("--random-seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = db_file = None
+    if args.url:
+        url, emails = args.url.rstrip("/"), args.email or ["seed_user1@example.com"]
+    else:
+        url, server, db_file = start_local_server(args)
+        emails = [f"seed_user{i}@example.com" for i in range(1, args.seed_users + 1)]
+
+    try:
+        session = requests.Session()
+        accounts = [(email, login(session, url, email, args.password)) for email in emails]
+        print(f"\n{'escenario':<14} {'n':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for name in args.scenarios.split(","):
+            if name not in SCENARIOS:
+                sys.exit(f"Escenario desconocido: {name}. Disponibles: {', '.join(SCENARIOS)}")
+            timings, errors, wall = run_scenario(name, url, accounts, args)
+            for label, values in timings.items():
+                ms = [v * 1000 for v in values]
+                print(f"{label:<14} {len(values):>6} {errors[label]:>5} {statistics.median(ms):>8.1f} "
+                      f"{percentile(ms, 95):>8.1f} {percentile(ms, 99):>8.1f} {len(values) / wall:>8.1f}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+            os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
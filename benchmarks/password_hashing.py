@@ -0,0 +1,48 @@
+"""
+Benchmark del hash de contraseñas: verificaciones (logins) por segundo, en total y por núcleo,
+para cada método de hash. Sirve para elegir PASSWORD_HASH_METHOD y PASSWORD_HASH_WORKERS.
+
+    $ python benchmarks/password_hashing.py
+    $ python benchmarks/password_hashing.py --methods scrypt,pbkdf2:sha256:600000 --seconds 5 --workers 4
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = "scrypt,scrypt:16384:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:260000"
+
+
+def verify_for(password_hash, seconds):
+    """Verifica la misma contraseña en bucle durante `seconds` y devuelve cuántas veces lo hizo."""
+    done, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        check_password_hash(password_hash, "correct horse battery staple")
+        done += 1
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", default=DEFAULT_METHODS)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"{'método':<28} {'ms/login':>9} {'logins/s':>9} {'logins/s/núcleo':>16}")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for method in args.methods.split(","):
+            password_hash = generate_password_hash("correct horse battery staple", method)
+            started = time.perf_counter()
+            check_password_hash(password_hash, "correct horse battery staple")
+            single_ms = (time.perf_counter() - started) * 1000
+
+            futures = [pool.submit(verify_for, password_hash, args.seconds) for _ in range(args.workers)]
+            total = sum(future.result() for future in futures)
+            rate = total / args.seconds
+            print(f"{method:<28} {single_ms:>9.1f} {rate:>9.1f} {rate / args.workers:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Microbenchmark: listado de transacciones con serialize() del ORM frente a la proyección de columnas.
+
+    $ python benchmarks/serializers.py                 # 1k, 100k y 1M filas
+    $ python benchmarks/serializers.py --rows 1000,50000
+
+Usa una base SQLite temporal; no toca la base de datos configurada en DATABASE_URL.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import logging  # noqa: E402
+from flask import jsonify  # noqa: E402
+from app import create_app  # noqa: E402
+from api.models import db, User, Transaction  # noqa: E402
+from api.serializers import projected_columns, serialize_rows, json_response  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    user = User(name="Bench", company="Bench", email="bench@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "user_id": user.id, "amount": float(i % 1000) + 0.5, "description": f"Transacción {i}",
+            "transaction_type": "income" if i % 2 else "expense", "status": "completed",
+            "company": "ACME", "date": start + timedelta(minutes=i),
+        })
+        if len(batch) == 10000:
+            db.session.execute(db.insert(Transaction.__table__), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Transaction.__table__), batch)
+    db.session.commit()
+    return user.id
+
+
+def orm_path(user_id):
+    transactions = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.date, Transaction.id).all()
+    return jsonify([transaction.serialize() for transaction in transactions]).data
+
+
+def projection_path(user_id):
+    rows = (Transaction.query.filter_by(user_id=user_id)
+            .with_entities(*projected_columns(Transaction))
+            .order_by(Transaction.date, Transaction.id).all())
+    return json_response(serialize_rows(Transaction, rows)).data
+
+
+def measure(fn, user_id, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        body = fn(user_id)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,100000,1000000")
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    try:
+        app = create_app("test", SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_file}")
+        print(f"{'filas':>10} {'orm (s)':>10} {'proyección (s)':>15} {'speedup':>8}")
+        with app.app_context(), app.test_request_context():
+            for rows in [int(n) for n in args.rows.split(",")]:
+                user_id = seed(rows)
+                repeat = 5 if rows <= 100000 else 1
+                orm_time, orm_body = measure(orm_path, user_id, repeat)
+                projection_time, projection_body = measure(projection_path, user_id, repeat)
+                assert orm_body == projection_body, "La salida de la proyección no coincide con serialize()"
+                print(f"{rows:>10} {orm_time:>10.3f} {projection_time:>15.3f} {orm_time / projection_time:>7.1f}x")
+    finally:
+        os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de arranque en frío: tiempo de importar app.py, de create_app y de la primera petición,
+cada repetición en un proceso nuevo (como un worker de gunicorn recién lanzado, sin Flask-Migrate
+salvo con --migrations).
+
+    $ python benchmarks/startup.py
+    $ python benchmarks/startup.py --profiles production --repeat 10
+    $ python benchmarks/startup.py --imports 15     # los 15 módulos que más tardan en importarse
+
+Usa una base SQLite temporal; no toca la base de datos configurada en DATABASE_URL.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app(sys.argv[1], MIGRATIONS_ENABLED=sys.argv[2] == "1")
+created = time.perf_counter()
+from api.models import db
+with app.app_context():
+    db.create_all()
+client = app.test_client()
+ready = time.perf_counter()
+client.post("/api/login", json={"email": "nadie@example.com", "password": "x"})
+first_request = time.perf_counter()
+print(json.dumps({"import": imported - started, "create_app": created - imported,
+                  "first_request": first_request - ready}))
+"""
+
+
+def run_child(profile, env, migrations, extra_args=()):
+    command = [sys.executable, *extra_args, "-c", CHILD, profile, "1" if migrations else "0"]
+    return subprocess.run(command, cwd=SRC, env=env, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(profile, env, migrations, count):
+    """Parsea la salida de -X importtime (microsegundos acumulados por módulo)."""
+    stderr = run_child(profile, env, migrations, ("-X", "importtime")).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, module = (part.strip() for part in line[len("import time:"):].split("|"))
+            rows.append((int(cumulative), module))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", default="production,development,test")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--imports", type=int, default=0, help="Mostrar los N imports más lentos")
+    parser.add_argument("--migrations", action="store_true", help="Incluir Flask-Migrate, como el CLI de flask")
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_file}", "JWT_SECRET_KEY": "benchmark",
+           "LOG_LEVEL": "WARNING"}
+    try:
+        print(f"{'perfil':<12} {'import ms':>10} {'create_app ms':>14} {'1ª petición ms':>15} {'total ms':>9}")
+        for profile in args.profiles.split(","):
+            samples = [json.loads(run_child(profile, env, args.migrations).stdout.strip().splitlines()[-1])
+                       for _ in range(args.repeat)]
+            median = {key: statistics.median(sample[key] for sample in samples) * 1000 for key in samples[0]}
+            print(f"{profile:<12} {median['import']:>10.0f} {median['create_app']:>14.0f} "
+                  f"{median['first_request']:>15.0f} {sum(median.values()):>9.0f}")
+            if args.imports:
+                for cumulative, module in slowest_imports(profile, env, args.migrations, args.imports):
+                    print(f"    {cumulative / 1000:>8.1f} ms  {module}")
+    finally:
+        os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
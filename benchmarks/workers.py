@@ -0,0 +1,73 @@
+"""
+Benchmark de escalado de gunicorn: la misma carga de load.py contra 1, 2, 4… workers y cada tipo de
+worker, sobre una única base poblada al principio, para elegir WEB_CONCURRENCY y GUNICORN_WORKER_CLASS.
+
+    $ python benchmarks/workers.py
+    $ python benchmarks/workers.py --workers 1,2,4,8 --classes sync,gthread --concurrency 16
+    $ python benchmarks/workers.py --scenarios list_page --requests 1000
+
+Informa req/s y p95 de cada combinación y la aceleración respecto a la primera fila de cada tipo.
+"""
+import os
+import argparse
+import statistics
+import requests
+from load import SCENARIOS, percentile, prepare_database, start_server, login, run_scenario
+
+
+def measure(url, emails, args):
+    session = requests.Session()
+    accounts = [(email, login(session, url, email, args.password)) for email in emails]
+    run_scenario(args.scenarios.split(",")[0], url, accounts, args)  # Calentamiento (cachés, pools)
+    total, wall, errors, latencies = 0, 0.0, 0, []
+    for name in args.scenarios.split(","):
+        timings, scenario_errors, scenario_wall = run_scenario(name, url, accounts, args)
+        total += sum(len(values) for values in timings.values())
+        errors += sum(scenario_errors.values())
+        latencies.extend(value * 1000 for values in timings.values() for value in values)
+        wall += scenario_wall
+    return total / wall, percentile(latencies, 95), statistics.median(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--classes", default="sync,gthread")
+    parser.add_argument("--threads", type=int, default=4, help="Hilos por worker gthread")
+    parser.add_argument("--scenarios", default="list_page,chart,crud")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="Peticiones por escenario")
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--seed-users", type=int, default=4)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--transactions-per-month", type=int, default=200)
+    parser.add_argument("--random-seed", type=int, default=42)
+    args = parser.parse_args()
+    for name in args.scenarios.split(","):
+        if name not in SCENARIOS:
+            parser.error(f"Escenario desconocido: {name}. Disponibles: {', '.join(SCENARIOS)}")
+
+    env, db_file = prepare_database(args)
+    env["GUNICORN_THREADS"] = str(args.threads)
+    emails = [f"seed_user{i}@example.com" for i in range(1, args.seed_users + 1)]
+    try:
+        print(f"CPUs disponibles: {len(os.sched_getaffinity(0))}")
+        print(f"\n{'clase':<8} {'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'err':>5} {'x':>6}")
+        for worker_class in args.classes.split(","):
+            baseline = None
+            for workers in (int(w) for w in args.workers.split(",")):
+                url, server = start_server(env, workers, worker_class)
+                try:
+                    throughput, p95, p50, errors = measure(url, emails, args)
+                finally:
+                    server.terminate()
+                    server.wait()
+                baseline = baseline or throughput
+                print(f"{worker_class:<8} {workers:>7} {throughput:>8.1f} {p50:>8.1f} {p95:>8.1f} {errors:>5} "
+                      f"{throughput / baseline:>5.2f}x", flush=True)
+    finally:
+        os.remove(db_file)
+
+
+if __name__ == "__main__":
+    main()
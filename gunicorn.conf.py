@@ -0,0 +1,71 @@
+"""
+Configuración de gunicorn (gunicorn -c gunicorn.conf.py wsgi --chdir ./src/).
+
+Todo se puede ajustar por entorno:
+    WEB_CONCURRENCY            número de workers (por defecto 2 * CPUs + 1, máximo GUNICORN_MAX_WORKERS)
+    GUNICORN_WORKER_CLASS      sync o gthread (por defecto gthread con 1-2 CPUs, sync con más)
+    GUNICORN_THREADS           hilos por worker gthread (por defecto 4)
+    GUNICORN_PRELOAD           1/0, cargar la app en el master antes de hacer fork (por defecto 1)
+    GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS, PORT
+    METRICS_DIR                directorio donde los workers suman sus métricas (por defecto uno temporal)
+"""
+import gc
+import os
+import sys
+import shutil
+import tempfile
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))  # Respeta los límites de CPU del contenedor
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+cpus = _cpu_count()
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '3001')}")
+workers = int(os.getenv("WEB_CONCURRENCY", min(cpus * 2 + 1, int(os.getenv("GUNICORN_MAX_WORKERS", 12)))))
+# Con pocas CPUs salen más baratos hilos que procesos para solapar la espera a la base de datos y a QuickChart
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread" if cpus <= 2 else "sync")
+threads = int(os.getenv("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers de vez en cuando acota cualquier crecimiento de memoria (cachés, fragmentación)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")  # "-" para stdout
+errorlog = "-"
+
+# /metrics suma las métricas de todos los workers a partir de este directorio (api/metrics.py)
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "gunicorn-metrics"))
+
+
+def on_starting(server):
+    # Lo que haya es de un arranque anterior: los contadores empiezan de cero con el servidor
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+
+
+def when_ready(server):
+    if preload_app:
+        # La app ya está cargada en el master: congelar sus objetos evita que el recolector de basura
+        # de cada worker los toque y rompa el copy-on-write de las páginas compartidas
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Los workers no pueden compartir las conexiones que el master pudiera haber abierto."""
+    wsgi = sys.modules.get("wsgi")
+    if wsgi is None:  # Sin preload_app la app se carga después, ya en el worker
+        return
+    from api.models import db
+    with wsgi.application.app_context():
+        for engine in db.engines.values():
+            # close=False: descarta el pool heredado sin cerrar los sockets que sigue usando el master
+            engine.dispose(close=False)
+    server.log.info("Worker %s: pools de conexiones heredados descartados", worker.pid)
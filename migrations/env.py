@@ -90,9 +90,19 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # los índices de búsqueda (tablas FTS5 en SQLite, índices GIN de expresión en Postgres) se
+    # mantienen a mano en sus migraciones: autogenerate no debe proponer borrarlos
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == "table" and "_fts" in name:
+            return False
+        if type_ == "index" and name.endswith(("_search", "_search_trgm")):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
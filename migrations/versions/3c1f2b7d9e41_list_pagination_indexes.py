@@ -0,0 +1,32 @@
+"""List pagination indexes
+
+Revision ID: 3c1f2b7d9e41
+Revises: 017863c77e7d
+Create Date: 2026-10-18 09:12:03.511204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f2b7d9e41'
+down_revision = '017863c77e7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_transactions_user_id_date_id', 'transactions', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_payments_user_id_date_id', 'payments', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_budgets_user_id_date_id', 'budgets', ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_employees_user_id_id', 'employees', ['user_id', 'id'], unique=False)
+    op.create_index('ix_projects_user_id_id', 'projects', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_projects_user_id_id', table_name='projects')
+    op.drop_index('ix_employees_user_id_id', table_name='employees')
+    op.drop_index('ix_budgets_user_id_date_id', table_name='budgets')
+    op.drop_index('ix_payments_user_id_date_id', table_name='payments')
+    op.drop_index('ix_transactions_user_id_date_id', table_name='transactions')
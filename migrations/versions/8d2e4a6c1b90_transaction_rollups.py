@@ -0,0 +1,44 @@
+"""Transaction rollups
+
+Revision ID: 8d2e4a6c1b90
+Revises: 3c1f2b7d9e41
+Create Date: 2026-10-18 10:02:47.208115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4a6c1b90'
+down_revision = '3c1f2b7d9e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('transaction_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False),
+    sa.Column('transaction_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'period', 'transaction_type', 'status')
+    )
+
+    # Poblar con las transacciones existentes (equivale a `flask rebuild-rollups`)
+    if op.get_bind().dialect.name == 'postgresql':
+        period = "CAST(date_trunc('month', date) AS DATE)"
+    else:
+        period = "strftime('%Y-%m-01', date)"
+    op.execute(
+        "INSERT INTO transaction_rollups (user_id, period, transaction_type, status, amount, count) "
+        f"SELECT user_id, {period}, transaction_type, status, SUM(amount), COUNT(*) FROM transactions "
+        f"GROUP BY user_id, {period}, transaction_type, status"
+    )
+
+
+def downgrade():
+    op.drop_table('transaction_rollups')
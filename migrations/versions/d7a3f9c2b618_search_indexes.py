@@ -0,0 +1,61 @@
+"""Search indexes
+
+Revision ID: d7a3f9c2b618
+Revises: c4d81e6f2a35
+Create Date: 2026-10-18 19:48:12.402981
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f9c2b618'
+down_revision = 'c4d81e6f2a35'
+branch_labels = None
+depends_on = None
+
+# tabla: (columna del título, columna del detalle); las expresiones deben coincidir con api/search.py
+SEARCH_TABLES = {
+    'transactions': ('description', 'company'),
+    'projects': ('name', 'client'),
+    'employees': ('name', 'position'),
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        for table, (title, detail) in SEARCH_TABLES.items():
+            document = f"coalesce({title}, '') || ' ' || coalesce({detail}, '')"
+            op.execute(f"CREATE INDEX ix_{table}_search ON {table} USING gin (user_id, to_tsvector('simple', {document}))")
+            op.execute(f"CREATE INDEX ix_{table}_search_trgm ON {table} USING gin (user_id, ({document}) gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        for table, (title, detail) in SEARCH_TABLES.items():
+            fts = f"{table}_fts"
+            op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({title}, {detail}, content='{table}', "
+                       f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+            op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                       f"INSERT INTO {fts}(rowid, {title}, {detail}) VALUES (new.id, new.{title}, new.{detail}); END")
+            op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, {title}, {detail}) "
+                       f"VALUES ('delete', old.id, old.{title}, old.{detail}); END")
+            op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {title}, {detail} ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, {title}, {detail}) "
+                       f"VALUES ('delete', old.id, old.{title}, old.{detail}); "
+                       f"INSERT INTO {fts}(rowid, {title}, {detail}) VALUES (new.id, new.{title}, new.{detail}); END")
+            # Indexar las filas que ya existen
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCH_TABLES:
+        if dialect == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_trgm")
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search")
+        elif dialect == 'sqlite':
+            for suffix in ('au', 'ad', 'ai'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
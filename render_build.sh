@@ -6,5 +6,6 @@ npm install
 npm run build
 
 pipenv install
+pipenv run precompress-static
 
 pipenv run upgrade
@@ -0,0 +1,179 @@
+"""
+Ejecución de lotes de operaciones (create/update/delete) sobre Employee, Project, Budget y Transaction
+en una sola transacción, comprobando la propiedad de todos los ids con una consulta por modelo.
+"""
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from api.models import db, Transaction, TransactionRollup, DataVersion, Employee, Project, Budget
+from api.utils import APIException, parse_date
+from api.serializers import serialize_instance
+
+# modelo: (clase, campos obligatorios al crear, campos modificables, campos de fecha 'YYYY-MM-DD')
+BATCH_MODELS = {
+    "employee": (Employee, ("name", "salary"), ("name", "salary", "position"), ()),
+    "project": (Project, ("name", "description", "client"), ("name", "description", "client", "end_date"), ("end_date",)),
+    "budget": (Budget, ("project_id", "amount", "status"), ("amount", "status", "description"), ()),
+    "transaction": (Transaction, ("amount", "transaction_type", "status"),
+                    ("amount", "description", "transaction_type", "status", "company", "date"), ("date",)),
+}
+BATCH_OPERATIONS = ("create", "update", "delete")
+NUMERIC_FIELDS = ("amount", "salary")
+
+
+def fail(index, message, status_code=400):
+    raise APIException(message, status_code=status_code, payload={"operation": index})
+
+
+def validate(operations, max_operations):
+    if not isinstance(operations, list) or not operations:
+        raise APIException("Se esperaba una lista no vacía de operaciones", status_code=400)
+    if len(operations) > max_operations:
+        raise APIException(f"Un lote admite como máximo {max_operations} operaciones", status_code=400)
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            fail(index, "Cada operación debe ser un objeto")
+        if operation.get("op") not in BATCH_OPERATIONS:
+            fail(index, f"op debe ser uno de: {', '.join(BATCH_OPERATIONS)}")
+        if operation.get("model") not in BATCH_MODELS:
+            fail(index, f"model debe ser uno de: {', '.join(BATCH_MODELS)}")
+        if operation["op"] != "create" and not isinstance(operation.get("id"), int):
+            fail(index, "update y delete necesitan un id entero")
+        if not isinstance(operation.get("data", {}), dict):
+            fail(index, "data debe ser un objeto")
+
+
+def resolve_project_id(index, value, results):
+    """project_id puede ser un id o "$n", el proyecto creado por la operación n del mismo lote."""
+    if is_reference(value):
+        try:
+            ref = int(value[1:])
+        except ValueError:
+            fail(index, f"Referencia inválida: {value}")
+        if not 0 <= ref < len(results) or not isinstance(results[ref], Project):
+            fail(index, f"La referencia {value} no apunta a un proyecto creado antes en el lote")
+        return results[ref].id
+    return value
+
+
+def is_reference(value):
+    return isinstance(value, str) and value.startswith("$")
+
+
+def parse_project_id(index, value):
+    """Convierte a entero un project_id que no es una referencia "$n"; el texto "1" cuenta como el id 1."""
+    try:
+        if isinstance(value, (bool, float)):
+            raise ValueError
+        return int(value)
+    except (TypeError, ValueError):
+        fail(index, "project_id debe ser un entero o una referencia \"$n\"")
+
+
+def load_owned(operations, user_id):
+    """
+    Carga de una vez todas las filas referenciadas y comprueba que pertenecen al usuario. Los project_id
+    de los presupuestos que no son referencias "$n" se normalizan a entero en la propia operación, de modo
+    que el id comprobado es exactamente el que se guarda.
+    """
+    ids = {name: set() for name in BATCH_MODELS}
+    for index, operation in enumerate(operations):
+        if operation["op"] != "create":
+            ids[operation["model"]].add(operation["id"])
+        data = operation.get("data", {})
+        if operation["model"] == "budget" and "project_id" in data and not is_reference(data["project_id"]):
+            data["project_id"] = parse_project_id(index, data["project_id"])
+            ids["project"].add(data["project_id"])
+
+    loaded = {}
+    for name, model_ids in ids.items():
+        model = BATCH_MODELS[name][0]
+        if model_ids:
+            rows = model.query.filter(model.id.in_(model_ids), model.user_id == int(user_id)).all()
+            loaded.update({(name, row.id): row for row in rows})
+
+    for index, operation in enumerate(operations):
+        if operation["op"] != "create" and (operation["model"], operation["id"]) not in loaded:
+            fail(index, f"{operation['model']} {operation['id']} no encontrado o no autorizado", status_code=403)
+        project_id = operation.get("data", {}).get("project_id")
+        if operation["model"] == "budget" and "project_id" in operation.get("data", {}) \
+                and not is_reference(project_id) and ("project", project_id) not in loaded:
+            fail(index, "Proyecto no encontrado o no autorizado", status_code=403)
+    return loaded
+
+
+def run_batch(operations, user_id, max_operations):
+    """Ejecuta las operaciones en orden. Si alguna falla no se aplica ninguna."""
+    validate(operations, max_operations)
+    loaded = load_owned(operations, user_id)
+    results, deleted, response = [], set(), []
+    index = 0
+
+    try:
+        for index, operation in enumerate(operations):
+            name, op = operation["model"], operation["op"]
+            model, required, fields, date_fields = BATCH_MODELS[name]
+            data = dict(operation.get("data", {}))
+            if name == "budget" and "project_id" in data:
+                data["project_id"] = resolve_project_id(index, data["project_id"], results)
+            for field in date_fields:
+                if data.get(field):
+                    try:
+                        data[field] = parse_date(data[field], field)
+                    except APIException as e:
+                        fail(index, e.message)
+            for field in NUMERIC_FIELDS:
+                if field in data and (isinstance(data[field], bool) or not isinstance(data[field], (int, float))):
+                    fail(index, f"{field} debe ser numérico")
+
+            if op == "create":
+                if not all(data.get(field) for field in required):
+                    fail(index, f"Faltan campos obligatorios ({', '.join(required)})")
+                allowed = fields + (("project_id",) if name == "budget" else ())
+                row = model(user_id=int(user_id), **{field: data[field] for field in allowed if field in data})
+                if name in ("transaction", "budget"):
+                    row.description = data.get("description", "")
+                    row.date = data.get("date") or datetime.utcnow()
+                if name == "project":
+                    row.start_date = datetime.utcnow()
+                db.session.add(row)
+                db.session.flush()
+                if name == "transaction":
+                    TransactionRollup.add(row)
+                results.append(row)
+                response.append({"index": index, "status": 201, "data": serialize_instance(row)})
+                continue
+
+            if (name, operation["id"]) in deleted:
+                fail(index, f"{name} {operation['id']} ya se eliminó en este lote", status_code=404)
+            row = loaded[(name, operation["id"])]
+
+            if op == "update":
+                if name == "transaction":
+                    old_key, old_amount = TransactionRollup.key_for(row), row.amount
+                for field in fields:
+                    if field in data:
+                        setattr(row, field, data[field])
+                if name == "transaction":
+                    TransactionRollup.move(old_key, old_amount, row)
+                db.session.flush()
+                results.append(row)
+                response.append({"index": index, "status": 200, "data": serialize_instance(row)})
+            else:
+                if name == "transaction":
+                    TransactionRollup.remove(row)
+                db.session.delete(row)
+                db.session.flush()
+                deleted.add((name, operation["id"]))
+                results.append(None)
+                response.append({"index": index, "status": 200, "data": {"id": operation["id"], "deleted": True}})
+
+        DataVersion.bump(user_id, *sorted({operation["model"] + "s" for operation in operations}))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        fail(index, "La operación viola una restricción de integridad (¿registros dependientes?)", status_code=409)
+    except Exception:
+        db.session.rollback()
+        raise
+    return response
@@ -0,0 +1,128 @@
+"""
+Modificación y borrado masivos por filtro (PATCH/DELETE /api/transactions y /api/budgets): una sola
+sentencia limitada al usuario, con opción dry_run que solo cuenta las filas afectadas.
+"""
+from sqlalchemy import select, func
+from api.models import db, Transaction, TransactionRollup, DataVersion, Budget, ROLLUP_COLUMNS
+from api.utils import APIException, owned_bulk_update, owned_bulk_delete, parse_date, parse_date_range
+from api.bulk_import import TRANSACTION_TYPES, TRANSACTION_STATUSES
+
+BUDGET_STATUSES = ("pending", "approved", "rejected")
+
+# recurso: (modelo, campos filtrables por igualdad, campos modificables, valores admitidos por campo)
+BULK_RESOURCES = {
+    "transactions": (Transaction, ("status", "transaction_type"),
+                     ("amount", "description", "transaction_type", "status", "company", "date"),
+                     {"status": TRANSACTION_STATUSES, "transaction_type": TRANSACTION_TYPES}),
+    "budgets": (Budget, ("status", "project_id"), ("amount", "status", "description"),
+                {"status": BUDGET_STATUSES}),
+}
+TRUE_VALUES = (True, "1", "true")
+
+
+def parse_filters(model, data, fields, max_ids):
+    """
+    Condiciones WHERE a partir de `data` (cuerpo JSON o query string): igualdad en `fields`,
+    start_date/end_date sobre `date` e `ids` (lista o "1,2,3"). Un filtro vacío solo se acepta con all=true,
+    para que un cuerpo olvidado no afecte a todas las filas del usuario.
+    """
+    table = model.__table__
+    conditions = []
+    for field in fields:
+        value = data.get(field)
+        if value in (None, ""):
+            continue
+        if table.c[field].type.python_type is int:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise APIException(f"{field} debe ser un entero", status_code=400)
+        elif not isinstance(value, str):
+            raise APIException(f"{field} debe ser texto", status_code=400)
+        conditions.append(table.c[field] == value)
+
+    start, end = parse_date_range(data)
+    if start:
+        conditions.append(table.c.date >= start)
+    if end:
+        conditions.append(table.c.date <= end)
+
+    if data.get("ids") not in (None, ""):
+        ids = data["ids"].split(",") if isinstance(data["ids"], str) else data["ids"]
+        try:
+            if not isinstance(ids, list) or not ids or any(isinstance(i, (bool, float)) for i in ids):
+                raise ValueError
+            ids = {int(i) for i in ids}
+        except (TypeError, ValueError):
+            raise APIException("ids debe ser una lista no vacía de enteros", status_code=400)
+        if len(ids) > max_ids:
+            raise APIException(f"Se admiten como máximo {max_ids} ids por operación", status_code=400)
+        conditions.append(table.c.id.in_(ids))
+
+    if not conditions and data.get("all") not in TRUE_VALUES:
+        filters = ", ".join((*fields, "start_date", "end_date", "ids"))
+        raise APIException(f"Indica al menos un filtro ({filters}) o all=true para afectar a todas las filas",
+                           status_code=400)
+    return conditions
+
+
+def parse_changes(data, fields, choices):
+    if not isinstance(data, dict) or not data:
+        raise APIException("changes debe ser un objeto no vacío", status_code=400)
+    unknown = set(data) - set(fields)
+    if unknown:
+        raise APIException(f"Campos no modificables: {', '.join(sorted(unknown))}. Se admiten: {', '.join(fields)}",
+                           status_code=400)
+
+    values = dict(data)
+    for field, allowed in choices.items():
+        if field in values and values[field] not in allowed:
+            raise APIException(f"{field} inválido. Debe ser uno de: {', '.join(allowed)}", status_code=400)
+    if "amount" in values and (isinstance(values["amount"], bool) or not isinstance(values["amount"], (int, float))):
+        raise APIException("amount debe ser numérico", status_code=400)
+    if "date" in values:
+        values["date"] = parse_date(values["date"])
+    return values
+
+
+def count_matching(model, user_id, conditions):
+    table = model.__table__
+    return db.session.execute(
+        select(func.count()).select_from(table).where(table.c.user_id == int(user_id), *conditions)
+    ).scalar()
+
+
+def bulk_update(resource, user_id, filters, changes, dry_run, max_ids):
+    """Aplica `changes` a todas las filas del usuario que cumplen `filters` y confirma."""
+    model, filter_fields, change_fields, choices = BULK_RESOURCES[resource]
+    conditions = parse_filters(model, filters, filter_fields, max_ids)
+    values = parse_changes(changes, change_fields, choices)
+    if dry_run:
+        return {"dry_run": True, "matched": count_matching(model, user_id, conditions)}
+
+    # Los totales mensuales solo se tocan si cambia alguna columna que los afecta
+    rollups = model is Transaction and bool(set(values) & set(ROLLUP_COLUMNS))
+    returning = ("id", *ROLLUP_COLUMNS) if rollups else ("id",)
+    rows = owned_bulk_update(model, user_id, conditions, values, returning, ROLLUP_COLUMNS if rollups else ())
+    if rollups:
+        TransactionRollup.apply_rows(added=[row for row, _ in rows], removed=[old for _, old in rows])
+    if rows:
+        DataVersion.bump(user_id, resource)
+    db.session.commit()
+    return {"updated": len(rows), "ids": sorted(row.id for row, _ in rows)}
+
+
+def bulk_delete(resource, user_id, filters, dry_run, max_ids):
+    """Borra todas las filas del usuario que cumplen `filters` y confirma."""
+    model, filter_fields, _, _ = BULK_RESOURCES[resource]
+    conditions = parse_filters(model, filters, filter_fields, max_ids)
+    if dry_run:
+        return {"dry_run": True, "matched": count_matching(model, user_id, conditions)}
+
+    rows = owned_bulk_delete(model, user_id, conditions, ("id", *ROLLUP_COLUMNS) if model is Transaction else ("id",))
+    if model is Transaction:
+        TransactionRollup.apply_rows(removed=rows)
+    if rows:
+        DataVersion.bump(user_id, resource)
+    db.session.commit()
+    return {"deleted": len(rows), "ids": sorted(row.id for row in rows)}
@@ -0,0 +1,144 @@
+"""
+Importación masiva de transacciones desde un cuerpo CSV o NDJSON leído en streaming.
+Las filas se validan una a una y se insertan por lotes (COPY en Postgres, executemany en el resto).
+"""
+import io
+import csv
+import json
+import math
+from datetime import datetime
+from api.models import db, Transaction, TransactionRollup, DataVersion, truncate_date
+
+IMPORT_COLUMNS = ("user_id", "amount", "description", "transaction_type", "status", "company", "date")
+TRANSACTION_TYPES = ("income", "expense")
+TRANSACTION_STATUSES = ("pending", "completed")
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_csv(stream):
+    yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+
+
+def read_ndjson(stream):
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = ValueError("JSON inválido")
+            yield row if isinstance(row, (dict, ValueError)) else ValueError("Cada línea debe ser un objeto JSON")
+
+
+# Tipo de contenido del cuerpo -> lector de filas
+READERS = {
+    "text/csv": read_csv,
+    "application/x-ndjson": read_ndjson,
+    "application/ndjson": read_ndjson,
+    "application/jsonl": read_ndjson,
+}
+
+
+def reader_for(mimetype):
+    return READERS.get(mimetype)
+
+
+def validate_row(row, user_id):
+    """Devuelve la fila lista para insertar o lanza ValueError con el motivo."""
+    if isinstance(row, ValueError):
+        raise row
+    try:
+        amount = float(row.get("amount"))
+    except (TypeError, ValueError):
+        raise ValueError("amount debe ser numérico")
+    if not math.isfinite(amount):
+        raise ValueError("amount debe ser numérico")
+
+    transaction_type = row.get("transaction_type")
+    if transaction_type not in TRANSACTION_TYPES:
+        raise ValueError(f"transaction_type debe ser uno de: {', '.join(TRANSACTION_TYPES)}")
+    status = row.get("status")
+    if status not in TRANSACTION_STATUSES:
+        raise ValueError(f"status debe ser uno de: {', '.join(TRANSACTION_STATUSES)}")
+
+    description = row.get("description") or ""
+    company = row.get("company") or None
+    if not isinstance(description, str) or not isinstance(company, (str, type(None))):
+        raise ValueError("description y company deben ser texto")
+    if len(description) > 250:
+        raise ValueError("description no puede superar 250 caracteres")
+    if company and len(company) > 120:
+        raise ValueError("company no puede superar 120 caracteres")
+
+    date = row.get("date")
+    if date:
+        try:
+            date = datetime.fromisoformat(date)
+        except (TypeError, ValueError):
+            raise ValueError("Formato de fecha inválido. Debe ser ISO 8601 ('YYYY-MM-DD')")
+    else:
+        date = datetime.utcnow()
+
+    return {
+        "user_id": int(user_id),
+        "amount": amount,
+        "description": description,
+        "transaction_type": transaction_type,
+        "status": status,
+        "company": company,
+        "date": date,
+    }
+
+
+def copy_rows(rows):
+    """COPY FROM STDIN sobre la conexión de la sesión actual (misma transacción)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([r"\N" if row[column] is None else row[column].isoformat() if column == "date" else row[column]
+                         for column in IMPORT_COLUMNS])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY transactions ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+def flush_batch(rows):
+    """Inserta un lote, actualiza los totales mensuales y confirma."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        copy_rows(rows)
+    else:
+        db.session.execute(db.insert(Transaction.__table__), rows)
+
+    totals = {}
+    for row in rows:
+        key = (row["user_id"], truncate_date(row["date"], "month"), row["transaction_type"], row["status"])
+        amount, count = totals.get(key, (0.0, 0))
+        totals[key] = (amount + row["amount"], count + 1)
+    for key, (amount, count) in totals.items():
+        TransactionRollup.apply(key, amount, count)
+    DataVersion.bump(rows[0]["user_id"], "transactions")
+
+    db.session.commit()
+
+
+def import_transactions(user_id, rows, batch_size):
+    """Valida e inserta `rows` por lotes. Devuelve el informe de importación."""
+    imported, error_count, errors, batch = 0, 0, [], []
+    # Numeración de filas de datos empezando en 1 (sin contar la cabecera del CSV)
+    for number, row in enumerate(rows, start=1):
+        try:
+            batch.append(validate_row(row, user_id))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": number, "error": str(e)})
+            continue
+        if len(batch) >= batch_size:
+            flush_batch(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        flush_batch(batch)
+        imported += len(batch)
+
+    return {"imported": imported, "error_count": error_count, "errors": errors}
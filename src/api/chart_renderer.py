@@ -0,0 +1,162 @@
+"""
+Renderizador local de gráficos: convierte la estructura de Transaction.transform_for_chart en un SVG
+dentro del proceso, con el mismo diseño de barras/línea y colores que QuickChart.
+"""
+import re
+import math
+import base64
+from html import escape
+from api.quickchart import chart_key
+
+WIDTH, HEIGHT = 800, 400
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 80, 20, 80, 70
+FONT = "Helvetica, Arial, sans-serif"
+
+
+def _color(value, default="#000000"):
+    """Devuelve (color, opacidad) a partir de un color CSS, separando el canal alfa de rgba()."""
+    match = re.fullmatch(r"rgba\((\d+),\s*(\d+),\s*(\d+),\s*([\d.]+)\)", (value or "").strip())
+    if match:
+        r, g, b, a = match.groups()
+        return f"rgb({r},{g},{b})", float(a)
+    return value or default, 1.0
+
+
+def _nice_step(span, ticks=5):
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for multiple in (1, 2, 2.5, 5, 10):
+        if raw <= multiple * magnitude:
+            return multiple * magnitude
+    return 10 * magnitude
+
+
+def _format_tick(value):
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+
+def _text(x, y, content, size, color, anchor="middle", extra=""):
+    fill, opacity = _color(color, "#ffffff")
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-family="{FONT}" font-size="{size}" fill="{fill}" '
+            f'fill-opacity="{opacity}" text-anchor="{anchor}"{extra}>{escape(str(content))}</text>')
+
+
+def render_svg(chart_data):
+    chart = chart_data["chart"]
+    labels = chart["data"]["labels"]
+    datasets = chart["data"]["datasets"]
+    options = chart.get("options", {})
+    plugins = options.get("plugins", {})
+    scales = options.get("scales", {})
+    base_type = chart.get("type", "bar")
+
+    plot_w = WIDTH - MARGIN_LEFT - MARGIN_RIGHT
+    plot_h = HEIGHT - MARGIN_TOP - MARGIN_BOTTOM
+
+    values = [v for dataset in datasets for v in dataset["data"]] or [0]
+    low, high = min(min(values), 0), max(max(values), 0)
+    if low == high:
+        high = low + 1
+    step = _nice_step(high - low)
+    low, high = math.floor(low / step) * step, math.ceil(high / step) * step
+
+    def y_of(value):
+        return MARGIN_TOP + plot_h - (value - low) / (high - low) * plot_h
+
+    slot = plot_w / max(len(labels), 1)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}">']
+
+    # Título
+    title = plugins.get("title", {})
+    if title.get("display"):
+        parts.append(_text(WIDTH / 2, 28, title.get("text", ""), title.get("font", {}).get("size", 18),
+                           title.get("color"), extra=' font-weight="bold"'))
+
+    # Leyenda
+    legend = plugins.get("legend", {}).get("labels", {})
+    legend_size = legend.get("font", {}).get("size", 12)
+    legend_x = MARGIN_LEFT
+    for dataset in datasets:
+        fill, opacity = _color(dataset.get("backgroundColor"))
+        stroke, _ = _color(dataset.get("borderColor"))
+        parts.append(f'<rect x="{legend_x}" y="44" width="30" height="12" fill="{fill}" fill-opacity="{opacity}" '
+                     f'stroke="{stroke}" stroke-width="{dataset.get("borderWidth", 1)}"/>')
+        parts.append(_text(legend_x + 36, 55, dataset["label"], legend_size, legend.get("color"), anchor="start"))
+        legend_x += 46 + len(dataset["label"]) * legend_size * 0.6
+
+    # Eje Y con sus marcas
+    y_scale = scales.get("y", {})
+    tick_color = y_scale.get("ticks", {}).get("color")
+    value = low
+    while value <= high + step / 2:
+        y = y_of(value)
+        parts.append(f'<line x1="{MARGIN_LEFT}" y1="{y:.1f}" x2="{WIDTH - MARGIN_RIGHT}" y2="{y:.1f}" '
+                     f'stroke="rgb(128,128,128)" stroke-opacity="0.3"/>')
+        parts.append(_text(MARGIN_LEFT - 8, y + 4, _format_tick(value), 12, tick_color, anchor="end"))
+        value += step
+    y_title = y_scale.get("title", {})
+    if y_title.get("display"):
+        parts.append(_text(18, MARGIN_TOP + plot_h / 2, y_title.get("text", ""), y_title.get("font", {}).get("size", 12),
+                           y_title.get("color"), extra=f' transform="rotate(-90 18 {MARGIN_TOP + plot_h / 2:.1f})"'))
+
+    # Eje X con las etiquetas de los periodos
+    x_scale = scales.get("x", {})
+    x_tick_color = x_scale.get("ticks", {}).get("color")
+    every = max(1, math.ceil(len(labels) / 20))
+    for i, label in enumerate(labels):
+        if i % every == 0:
+            parts.append(_text(MARGIN_LEFT + slot * (i + 0.5), MARGIN_TOP + plot_h + 18, label, 12, x_tick_color))
+    x_title = x_scale.get("title", {})
+    if x_title.get("display"):
+        parts.append(_text(MARGIN_LEFT + plot_w / 2, HEIGHT - 16, x_title.get("text", ""),
+                           x_title.get("font", {}).get("size", 12), x_title.get("color")))
+
+    # Barras agrupadas por periodo y líneas encima
+    bars = [d for d in datasets if d.get("type", base_type) == "bar"]
+    lines = [d for d in datasets if d.get("type", base_type) == "line"]
+    group_w = slot * 0.8
+    bar_w = group_w / max(len(bars), 1)
+    zero = y_of(0)
+    for b, dataset in enumerate(bars):
+        fill, opacity = _color(dataset.get("backgroundColor"))
+        stroke, _ = _color(dataset.get("borderColor"))
+        for i, v in enumerate(dataset["data"]):
+            x = MARGIN_LEFT + slot * i + (slot - group_w) / 2 + bar_w * b
+            top, bottom = sorted((y_of(v), zero))
+            parts.append(f'<rect x="{x:.1f}" y="{top:.1f}" width="{bar_w:.1f}" height="{bottom - top:.1f}" '
+                         f'fill="{fill}" fill-opacity="{opacity}" stroke="{stroke}" '
+                         f'stroke-width="{dataset.get("borderWidth", 1)}"/>')
+    for dataset in lines:
+        stroke, _ = _color(dataset.get("borderColor"))
+        points = [(MARGIN_LEFT + slot * (i + 0.5), y_of(v)) for i, v in enumerate(dataset["data"])]
+        path = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        parts.append(f'<polyline points="{path}" fill="none" stroke="{stroke}" stroke-width="{dataset.get("borderWidth", 1)}"/>')
+        fill, opacity = _color(dataset.get("backgroundColor"))
+        for x, y in points:
+            parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="{fill}" fill-opacity="{opacity}" stroke="{stroke}"/>')
+
+    parts.append(f'<line x1="{MARGIN_LEFT}" y1="{zero:.1f}" x2="{WIDTH - MARGIN_RIGHT}" y2="{zero:.1f}" stroke="rgb(128,128,128)"/>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+class LocalChartRenderer:
+    """Misma interfaz que QuickChartClient, pero sin red: devuelve el SVG como data URI."""
+
+    def __init__(self, cache, cache_ttl=300):
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+
+    def create_chart(self, chart_data):
+        key = chart_key(chart_data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        svg = render_svg(chart_data)
+        result = {
+            "success": True,
+            "url": "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode(),
+        }
+        self.cache.set(key, result, self.cache_ttl)
+        return result
@@ -0,0 +1,53 @@
+"""
+Construcción del gráfico de ingresos/gastos, compartida por GET /api/chart y los trabajos "chart".
+"""
+import requests
+from api.models import Transaction, TransactionRollup, CHART_GRANULARITIES, fill_chart_buckets
+from api.utils import APIException, parse_date_range
+from api.analytics import chart_rows
+from api.quickchart import get_chart_renderer
+from api.transaction_cache import cached_columns
+
+
+def parse_chart_args(args):
+    """Valida start_date, end_date y granularity. Devuelve (start, end, granularity)."""
+    granularity = args.get('granularity', 'month')
+    if granularity not in CHART_GRANULARITIES:
+        raise APIException(f"Granularidad inválida. Debe ser una de: {', '.join(CHART_GRANULARITIES)}", status_code=400)
+
+    start_date_parsed, end_date_parsed = parse_date_range(args)
+    return start_date_parsed, end_date_parsed, granularity
+
+
+def build_chart(user_id, start_date_parsed, end_date_parsed, granularity):
+    """Totales por periodo y llamada al renderizador. Devuelve la respuesta de QuickChart (o la local)."""
+    query = Transaction.query.filter_by(user_id=user_id)
+    if start_date_parsed:
+        query = query.filter(Transaction.date >= start_date_parsed)
+    if end_date_parsed:
+        query = query.filter(Transaction.date <= end_date_parsed)
+
+    # Los totales mensuales sirven si el rango no corta ningún mes
+    use_rollups = granularity in ("month", "quarter", "year") and not end_date_parsed \
+        and (not start_date_parsed or start_date_parsed.day == 1)
+
+    try:
+        if use_rollups:
+            totals = TransactionRollup.chart_totals(user_id, granularity, start_date_parsed)
+        elif (columns := cached_columns(user_id)) is not None:
+            rows = chart_rows(columns.between(start_date_parsed, end_date_parsed), granularity)
+            totals = fill_chart_buckets(rows, granularity, start_date_parsed, end_date_parsed)
+        else:
+            totals = Transaction.chart_totals(query, granularity, start_date_parsed, end_date_parsed)
+    except ValueError as e:
+        raise APIException(str(e), status_code=400)
+
+    if not totals:
+        raise APIException("No se encontraron transacciones en el rango de fechas proporcionado", status_code=404)
+
+    chart_data = Transaction.transform_for_chart(totals, granularity)
+
+    try:
+        return get_chart_renderer().create_chart(chart_data)
+    except requests.RequestException as e:
+        raise APIException(f"Error al generar el gráfico: {str(e)}", status_code=500)
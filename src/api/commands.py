@@ -1,6 +1,11 @@
 
+import time
 import click
-from api.models import db, User
+from api.models import db, User, TransactionRollup
+from api.passwords import hash_password
+from api.seed import seed
+from api.static_files import precompress
+from api.jobs import run_worker
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -18,17 +23,66 @@ def setup_commands(app):
     @click.argument("count") # argument of out command
     def insert_test_users(count):
         print("Creating test users")
+        password_hash = hash_password("123456")  # Mismo hash para todos: calcularlo una sola vez
         for x in range(1, int(count) + 1):
             user = User()
+            user.name = "Test User " + str(x)
+            user.company = "Test Company"
             user.email = "test_user" + str(x) + "@test.com"
-            user.password = "123456"
-            user.is_active = True
+            user.password_hash = password_hash
             db.session.add(user)
-            db.session.commit()
             print("User: ", user.email, " created.")
 
+        db.session.commit()
         print("All test users created")
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
\ No newline at end of file
+        print("Creating test data")
+        seed(users=1, years=1, transactions_per_month=20, employees=5, projects=3, budgets_per_project=2,
+             payments_per_month=5)
+        print("Test data created")
+
+    """
+    Bulk synthetic data for development and benchmarks, for example:
+    $ flask seed --users 10 --years 5 --transactions-per-month 1000
+    """
+    @app.cli.command("seed")
+    @click.option("--users", default=5, show_default=True)
+    @click.option("--years", default=2, show_default=True)
+    @click.option("--transactions-per-month", default=200, show_default=True)
+    @click.option("--employees", default=15, show_default=True)
+    @click.option("--projects", default=8, show_default=True)
+    @click.option("--budgets-per-project", default=4, show_default=True)
+    @click.option("--payments-per-month", default=30, show_default=True)
+    @click.option("--password", default="123456", show_default=True)
+    @click.option("--batch-size", default=5000, show_default=True)
+    @click.option("--random-seed", default=42, show_default=True)
+    def seed_command(**options):
+        started = time.perf_counter()
+        inserted = seed(**options)
+        print("Inserted:", inserted, f"in {time.perf_counter() - started:.1f} s")
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups():
+        print("Rebuilding transaction rollups")
+        TransactionRollup.rebuild()
+        db.session.commit()
+        print("Rollups rebuilt:", TransactionRollup.query.count(), "rows")
+
+    @app.cli.command("precompress-static")
+    def precompress_static():
+        """Genera las variantes .gz/.br de public/ (ejecutar tras npm run build)."""
+        static_files = app.extensions["static_files"]
+        print("Precompressed variants written:", precompress(static_files.root))
+        static_files.refresh()
+
+    """
+    Runs queued background jobs (charts, exports, imports) in a process pool until stopped:
+    $ flask worker --workers 4
+    """
+    @app.cli.command("worker")
+    @click.option("--workers", type=int, help="Processes in the pool (default JOBS_WORKERS)")
+    @click.option("--burst", is_flag=True, help="Exit once there are no jobs left to run")
+    def worker(workers, burst):
+        run_worker(workers or app.config['JOBS_WORKERS'], burst=burst)
@@ -0,0 +1,76 @@
+"""
+Enrutado de lecturas a réplicas: las peticiones GET del blueprint `api` leen de una réplica
+(SQLALCHEMY_BINDS "replica_N") y el resto va al primario. Tras una escritura, el mismo cliente
+queda fijado al primario durante READ_YOUR_WRITES_SECONDS para que lea lo que acaba de escribir.
+"""
+import os
+import time
+import random
+import hashlib
+import threading
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Insert, Update, Delete
+
+PIN_COOKIE = "db_primary_until"
+_pins = {}
+_pins_lock = threading.Lock()
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, (Insert, Update, Delete)) \
+                and has_request_context() and g.get("db_replica"):
+            return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _client_key():
+    """Identifica al cliente por su cabecera Authorization sin tener que decodificar el JWT."""
+    authorization = request.headers.get("Authorization")
+    return hashlib.sha1(authorization.encode()).hexdigest() if authorization else None
+
+
+def _pinned_to_primary(now, window):
+    # La cookie la controla el cliente: un valor más allá de la ventana no lo ha puesto la API y se ignora
+    try:
+        if now < float(request.cookies.get(PIN_COOKIE, 0)) <= now + window:
+            return True
+    except ValueError:
+        pass
+    key = _client_key()
+    with _pins_lock:
+        return key is not None and _pins.get(key, 0) > now
+
+
+def setup_read_replicas(app):
+    urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for i, url in enumerate(urls):
+        binds[f"replica_{i}"] = url.replace("postgres://", "postgresql://")
+    app.config.setdefault('READ_YOUR_WRITES_SECONDS', float(os.getenv("READ_YOUR_WRITES_SECONDS", 5)))
+
+    @app.before_request
+    def route_reads_to_replica():
+        replicas = [key for key in app.config['SQLALCHEMY_BINDS'] if key.startswith("replica_")]
+        if replicas and request.blueprint == "api" and request.method in ("GET", "HEAD") \
+                and not _pinned_to_primary(time.time(), app.config['READ_YOUR_WRITES_SECONDS']):
+            g.db_replica = random.choice(replicas)
+
+    @app.after_request
+    def pin_writer_to_primary(response):
+        if request.blueprint == "api" and request.method not in ("GET", "HEAD", "OPTIONS") \
+                and response.status_code < 400:
+            until = time.time() + app.config['READ_YOUR_WRITES_SECONDS']
+            # Cookie para que cualquier worker lo respete; mapa en memoria para clientes sin cookies
+            response.set_cookie(PIN_COOKIE, f"{until:.3f}", max_age=int(app.config['READ_YOUR_WRITES_SECONDS']) + 1,
+                                httponly=True, samesite="Lax")
+            key = _client_key()
+            if key:
+                with _pins_lock:
+                    _pins[key] = until
+                    if len(_pins) > 10000:
+                        now = time.time()
+                        for expired in [k for k, v in _pins.items() if v <= now]:
+                            del _pins[expired]
+        return response
@@ -0,0 +1,152 @@
+"""
+Exportación en streaming de transacciones, pagos y presupuestos en CSV, NDJSON o Parquet.
+Las filas se leen con un cursor del servidor (yield_per) y se escriben según llegan,
+así que la memoria no crece con el número de filas.
+"""
+import io
+import csv
+import json
+import zlib
+from datetime import datetime
+from api.models import db, Transaction, Payment, Budget
+from api.serializers import SERIALIZED_COLUMNS
+from api.utils import APIException, parse_date_range
+
+EXPORT_RESOURCES = {
+    "transactions": (Transaction, SERIALIZED_COLUMNS[Transaction]),
+    "payments": (Payment, SERIALIZED_COLUMNS[Payment]),
+    "budgets": (Budget, SERIALIZED_COLUMNS[Budget]),
+}
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_BATCH_SIZE = 1000
+
+
+def parse_export_args(resource, args):
+    """Valida recurso, formato y rango de fechas de una exportación. Devuelve (formato, inicio, fin, gzip)."""
+    if resource not in EXPORT_RESOURCES:
+        raise APIException(f"Recurso no exportable. Debe ser uno de: {', '.join(EXPORT_RESOURCES)}", status_code=404)
+
+    fmt = args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise APIException(f"Formato inválido. Debe ser uno de: {', '.join(EXPORT_FORMATS)}", status_code=400)
+    if fmt == 'parquet' and not parquet_available():
+        raise APIException("La exportación a Parquet requiere instalar pyarrow", status_code=501)
+
+    start_date_parsed, end_date_parsed = parse_date_range(args)
+
+    return fmt, start_date_parsed, end_date_parsed, args.get('gzip') in ('1', 'true')
+
+
+def export_filename(resource, fmt, gzip):
+    return f"{resource}.{fmt}" + (".gz" if gzip else "")
+
+
+def export_mimetype(fmt, gzip):
+    return "application/gzip" if gzip else EXPORT_FORMATS[fmt]
+
+
+def export_rows(resource, user_id, start=None, end=None):
+    """Itera las filas del recurso como tuplas, por lotes de EXPORT_BATCH_SIZE, en orden (date, id)."""
+    model, columns = EXPORT_RESOURCES[resource]
+    query = db.select(*[getattr(model, column) for column in columns]).where(model.user_id == int(user_id))
+    if start:
+        query = query.where(model.date >= start)
+    if end:
+        query = query.where(model.date <= end)
+    query = query.order_by(model.date, model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    for partition in db.session.execute(query).partitions():
+        yield partition
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_chunks(columns, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_iso(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(columns, partitions):
+    for rows in partitions:
+        yield "".join(json.dumps(dict(zip(columns, map(_iso, row)))) + "\n" for row in rows).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura que acumula bytes para ir entregándolos al generador."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def parquet_schema(model, columns):
+    import pyarrow as pa
+
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string(), datetime: pa.timestamp("us")}
+    return pa.schema([(column, types[getattr(model, column).type.python_type]) for column in columns])
+
+
+def parquet_chunks(model, columns, partitions):
+    """Un row group por lote; el pie del fichero se escribe al cerrar."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(model, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in partitions:
+        writer.write_table(pa.Table.from_pydict({column: [row[i] for row in rows] for i, column in enumerate(columns)}, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # wbits=31: formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(resource, fmt, user_id, start=None, end=None, gzip=False):
+    model, columns = EXPORT_RESOURCES[resource]
+    partitions = export_rows(resource, user_id, start, end)
+    if fmt == "parquet":
+        chunks = parquet_chunks(model, columns, partitions)
+    else:
+        chunks = (csv_chunks if fmt == "csv" else ndjson_chunks)(columns, partitions)
+    chunks = (chunk for chunk in chunks if chunk)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,387 @@
+"""
+Cola de trabajos en segundo plano sobre la propia base de datos (tabla `jobs`), sin broker externo.
+
+Las peticiones encolan un trabajo y responden 202 con su id; `flask worker` los reclama de uno en uno
+y los ejecuta en un pool de procesos. Cada intento reclamado tiene un plazo de visibilidad
+(JOBS_VISIBILITY_TIMEOUT) que el worker prolonga periódicamente mientras el intento sigue en marcha:
+si el worker muere sin terminarlo, al vencer el plazo otro worker lo vuelve a reclamar. Solo el
+intento que conserva el token actual puede cerrar el trabajo. Los errores transitorios se reintentan
+con espera exponencial hasta max_attempts; los errores de validación (APIException 4xx) fallan a la
+primera. Como mucho se ejecutan JOBS_MAX_RUNNING_PER_USER trabajos a la vez de un mismo usuario
+(exacto con un único `flask worker`; con varios a la vez el límite puede superarse puntualmente).
+Las subidas de las importaciones y los resultados de las exportaciones se guardan en la tabla
+job_files, no en disco: el worker puede ejecutarse en otra máquina que el servidor web.
+"""
+import io
+import os
+import time
+import signal
+import logging
+import tempfile
+from uuid import uuid4
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, func, or_, and_, tuple_
+from api.models import db, Job, JobFile
+from api.utils import APIException
+from api.charts import parse_chart_args, build_chart
+from api.export import export_filename, export_mimetype, export_stream
+from api.bulk_import import import_transactions, reader_for
+
+logger = logging.getLogger("api.jobs")
+
+PENDING_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed")
+PURGE_INTERVAL = 3600
+JOB_FILE_CHUNK_SIZE = 1024 * 1024
+
+_app = None  # Aplicación de los procesos del pool (heredada por fork o creada en _init_process)
+
+
+class JobFileReader(io.RawIOBase):
+    """
+    Lectura de un fichero de job_files trozo a trozo, con una consulta por trozo: no mantiene un cursor
+    abierto, así que quien lo lee puede confirmar transacciones entre medias (la importación lo hace
+    en cada lote).
+    """
+
+    def __init__(self, job_id, name):
+        self.job_id, self.name, self.seq = job_id, name, 0
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.pending:
+            self.pending = db.session.execute(
+                select(JobFile.data).where(JobFile.job_id == self.job_id, JobFile.name == self.name,
+                                           JobFile.seq == self.seq)
+            ).scalar() or b""
+            self.seq += 1
+        size = min(len(buffer), len(self.pending))
+        buffer[:size], self.pending = self.pending[:size], self.pending[size:]
+        return size
+
+
+def write_job_file(job_id, name, stream):
+    """Guarda `stream` en job_files por trozos de JOB_FILE_CHUNK_SIZE, sin confirmar. Devuelve el tamaño."""
+    size = seq = 0
+    while chunk := stream.read(JOB_FILE_CHUNK_SIZE):
+        db.session.execute(insert(JobFile.__table__).values(job_id=job_id, name=name, seq=seq, data=chunk))
+        size += len(chunk)
+        seq += 1
+    return size
+
+
+def open_job_file(job_id, name):
+    return io.BufferedReader(JobFileReader(job_id, name), JOB_FILE_CHUNK_SIZE)
+
+
+def iter_job_file(job_id, name):
+    """Trozos del fichero en orden, para devolverlo en streaming."""
+    reader = JobFileReader(job_id, name)
+    while chunk := reader.read(JOB_FILE_CHUNK_SIZE):
+        yield chunk
+
+
+def job_file_exists(job_id, name):
+    return db.session.execute(
+        select(JobFile.seq).where(JobFile.job_id == job_id, JobFile.name == name).limit(1)
+    ).first() is not None
+
+
+def delete_job_files(job_ids, name=None):
+    table = JobFile.__table__
+    conditions = [table.c.job_id.in_(job_ids)] + ([table.c.name == name] if name else [])
+    db.session.execute(delete(table).where(*conditions))
+
+
+def run_chart_job(job):
+    start, end, granularity = parse_chart_args(job.payload)
+    return build_chart(job.user_id, start, end, granularity)
+
+
+def run_export_job(job):
+    payload = job.payload
+    start = datetime.fromisoformat(payload["start_date"]) if payload.get("start_date") else None
+    end = datetime.fromisoformat(payload["end_date"]) if payload.get("end_date") else None
+    filename = export_filename(payload["resource"], payload["format"], payload["gzip"])
+    # Primero a un temporal local del intento: la lectura de las filas mantiene abierto un cursor y la
+    # escritura en job_files se hace después en una transacción corta
+    with tempfile.TemporaryFile() as output:
+        for chunk in export_stream(payload["resource"], payload["format"], job.user_id, start, end, payload["gzip"]):
+            output.write(chunk)
+        output.seek(0)
+        table = Job.__table__
+        # Bloquea el trabajo y comprueba que este intento sigue siendo el vigente: un intento caducado
+        # no sustituye el resultado de otro
+        held = db.session.execute(
+            select(table.c.id).where(table.c.id == job.id, table.c.locked_by == job.locked_by,
+                                     table.c.status == "running").with_for_update()
+        ).first()
+        if held is None:
+            raise RuntimeError("El intento perdió el trabajo antes de guardar el resultado")
+        delete_job_files([job.id], "result")
+        size = write_job_file(job.id, "result", output)
+        db.session.commit()
+    return {"filename": filename, "mimetype": export_mimetype(payload["format"], payload["gzip"]), "size": size}
+
+
+def run_import_job(job):
+    try:
+        with open_job_file(job.id, "upload") as stream:
+            return import_transactions(job.user_id, reader_for(job.payload["mimetype"])(stream),
+                                       job.payload["batch_size"])
+    finally:
+        # Los lotes ya importados están confirmados; lo pendiente de un lote fallido se descarta
+        db.session.rollback()
+        delete_job_files([job.id], "upload")
+        db.session.commit()
+
+
+# Tipo de trabajo -> (función, intentos máximos). Una importación no se reintenta: los lotes ya
+# confirmados se duplicarían.
+JOB_KINDS = {
+    "chart": (run_chart_job, 3),
+    "export": (run_export_job, 3),
+    "import": (run_import_job, 1),
+}
+
+
+def enqueue(user_id, kind, payload, upload=None):
+    """
+    Crea el trabajo en estado queued y confirma. Rechaza con 429 si el usuario tiene demasiados pendientes.
+    `upload` (un stream binario) se guarda como fichero 'upload' del trabajo en la misma transacción.
+    """
+    pending = db.session.execute(
+        select(func.count()).select_from(Job).where(Job.user_id == int(user_id), Job.status.in_(PENDING_STATUSES))
+    ).scalar()
+    if pending >= current_app.config['JOBS_MAX_PENDING_PER_USER']:
+        raise APIException("Demasiados trabajos pendientes, inténtalo de nuevo más tarde", status_code=429,
+                           payload={"retry_after": 5})
+    job = Job(user_id=int(user_id), kind=kind, payload=payload, max_attempts=JOB_KINDS[kind][1])
+    db.session.add(job)
+    if upload is not None:
+        db.session.flush()
+        write_job_file(job.id, "upload", upload)
+    db.session.commit()
+    return job
+
+
+def reap_expired():
+    """Marca como fallidos los intentos caducados que ya no tienen reintentos."""
+    table = Job.__table__
+    now = datetime.utcnow()
+    db.session.execute(
+        update(table)
+        .where(table.c.status == "running", table.c.locked_until < now, table.c.attempts >= table.c.max_attempts)
+        .values(status="failed", error="Se agotó el plazo de ejecución en todos los intentos", finished_at=now,
+                locked_by=None, locked_until=None)
+    )
+    db.session.commit()
+
+
+def claim_job():
+    """
+    Reclama el siguiente trabajo disponible (en cola y con run_at vencido, o en curso con el plazo de
+    visibilidad vencido) de un usuario que no esté en su límite de concurrencia. Un único UPDATE con
+    FOR UPDATE SKIP LOCKED en Postgres. Devuelve (id, token del intento) o None.
+    """
+    table = Job.__table__
+    config = current_app.config
+    now = datetime.utcnow()
+    busy_users = (
+        select(table.c.user_id)
+        .where(table.c.status == "running", table.c.locked_until >= now)
+        .group_by(table.c.user_id)
+        .having(func.count() >= config['JOBS_MAX_RUNNING_PER_USER'])
+    )
+    candidate = (
+        select(table.c.id)
+        .where(
+            or_(and_(table.c.status == "queued", table.c.run_at <= now),
+                and_(table.c.status == "running", table.c.locked_until < now, table.c.attempts < table.c.max_attempts)),
+            table.c.user_id.not_in(busy_users),
+        )
+        .order_by(table.c.run_at, table.c.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    token = uuid4().hex
+    job_id = db.session.execute(
+        update(table)
+        .where(table.c.id == candidate)
+        .values(status="running", attempts=table.c.attempts + 1, locked_by=token, started_at=now,
+                locked_until=now + timedelta(seconds=config['JOBS_VISIBILITY_TIMEOUT']))
+        .returning(table.c.id)
+    ).scalar()
+    db.session.commit()
+    return (job_id, token) if job_id is not None else None
+
+
+def heartbeat(claimed):
+    """Prolonga el plazo de visibilidad de los intentos `claimed` [(id, token)] que siguen siendo suyos."""
+    if not claimed:
+        return
+    table = Job.__table__
+    locked_until = datetime.utcnow() + timedelta(seconds=current_app.config['JOBS_VISIBILITY_TIMEOUT'])
+    db.session.execute(
+        update(table)
+        .where(tuple_(table.c.id, table.c.locked_by).in_(claimed), table.c.status == "running")
+        .values(locked_until=locked_until)
+    )
+    db.session.commit()
+
+
+def _release(job_id, token, **values):
+    """Cierra el intento `token`; si el trabajo ya fue reclamado por otro intento no cambia nada."""
+    table = Job.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == job_id, table.c.locked_by == token, table.c.status == "running")
+        .values(locked_by=None, locked_until=None, **values)
+    )
+    db.session.commit()
+
+
+def retry_or_fail(job_id, token, error):
+    """Vuelve a encolar con espera exponencial si quedan intentos; si no, marca el trabajo como fallido."""
+    row = db.session.execute(select(Job.attempts, Job.max_attempts).where(Job.id == job_id)).first()
+    now = datetime.utcnow()
+    if row is not None and row.attempts < row.max_attempts:
+        delay = current_app.config['JOBS_RETRY_BACKOFF'] * 2 ** (row.attempts - 1)
+        _release(job_id, token, status="queued", error=error, run_at=now + timedelta(seconds=delay))
+    else:
+        _release(job_id, token, status="failed", error=error, finished_at=now)
+
+
+def execute_job(job_id, token):
+    """Se ejecuta en un proceso del pool."""
+    with _app.app_context():
+        try:
+            job = db.session.get(Job, job_id)
+            if job is None or job.locked_by != token:
+                return
+            handler = JOB_KINDS[job.kind][0]
+            try:
+                result = handler(job)
+            except APIException as e:
+                db.session.rollback()
+                if e.status_code < 500:
+                    _release(job_id, token, status="failed", error=e.message, finished_at=datetime.utcnow())
+                else:
+                    retry_or_fail(job_id, token, e.message)
+            except Exception as e:
+                logger.exception("Error en el trabajo %s (%s)", job_id, job.kind)
+                db.session.rollback()
+                retry_or_fail(job_id, token, str(e) or type(e).__name__)
+            else:
+                _release(job_id, token, status="succeeded", result=result, error=None,
+                         finished_at=datetime.utcnow())
+        finally:
+            db.session.remove()
+
+
+def purge_finished():
+    """
+    Borra los trabajos terminados hace más de JOBS_RETENTION_HOURS y sus ficheros: el resultado de las
+    exportaciones y la subida de las importaciones (que queda si el trabajo caducó sin ejecutarse).
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config['JOBS_RETENTION_HOURS'])
+    finished = db.session.execute(
+        select(Job.id).where(Job.status.in_(FINISHED_STATUSES), Job.finished_at < cutoff)
+    ).scalars().all()
+    if finished:
+        delete_job_files(finished)
+        db.session.execute(delete(Job.__table__).where(Job.__table__.c.id.in_(finished)))
+    db.session.commit()
+    return len(finished)
+
+
+def _init_process():
+    global _app
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C lo gestiona el proceso principal
+    if _app is None:  # Arranque por spawn: no hay nada heredado
+        from app import create_app
+        _app = create_app(MIGRATIONS_ENABLED=False)
+    with _app.app_context():
+        for engine in db.engines.values():
+            # Las conexiones heredadas por fork son del proceso principal
+            engine.dispose(close=False)
+
+
+def run_worker(workers, burst=False):
+    """
+    Bucle de `flask worker`: reclama trabajos mientras haya procesos libres y espera a que terminen.
+    SIGTERM o Ctrl+C dejan de reclamar y esperan a los trabajos en curso. Con `burst` termina
+    cuando no queda nada que ejecutar.
+    """
+    global _app
+    _app = current_app._get_current_object()
+    poll_interval = current_app.config['JOBS_POLL_INTERVAL']
+    heartbeat_interval = current_app.config['JOBS_VISIBILITY_TIMEOUT'] / 3
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        logger.info("Deteniendo el worker: se esperan los trabajos en curso")
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+    in_flight = {}
+    last_purge = last_heartbeat = 0
+    try:
+        while in_flight or not stopping:
+            if in_flight and time.monotonic() - last_heartbeat > heartbeat_interval:
+                heartbeat(list(in_flight.values()))
+                last_heartbeat = time.monotonic()
+            if not stopping:
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purge_finished()
+                    last_purge = time.monotonic()
+                reap_expired()
+                while len(in_flight) < workers and (claimed := claim_job()) is not None:
+                    in_flight[pool.submit(execute_job, *claimed)] = claimed
+                if burst and not in_flight:
+                    break
+            if not in_flight:
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id, token = in_flight.pop(future)
+                try:
+                    future.result()
+                except BrokenProcessPool:
+                    # Un proceso del pool murió (p.ej. por memoria): el pool entero queda inservible
+                    logger.error("El pool de trabajos se rompió; se reintentan los trabajos en curso")
+                    for other_id, other_token in [(job_id, token), *in_flight.values()]:
+                        retry_or_fail(other_id, other_token, "El proceso del trabajo terminó inesperadamente")
+                    in_flight.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+                    break
+                except Exception as e:
+                    logger.exception("Error inesperado en el trabajo %s", job_id)
+                    retry_or_fail(job_id, token, str(e) or type(e).__name__)
+    finally:
+        pool.shutdown(wait=True)
+        db.session.remove()
+
+
+def setup_jobs(app):
+    app.config.setdefault('JOBS_WORKERS', int(os.getenv("JOBS_WORKERS", min(2, os.cpu_count() or 1))))
+    app.config.setdefault('JOBS_POLL_INTERVAL', float(os.getenv("JOBS_POLL_INTERVAL", 1)))
+    app.config.setdefault('JOBS_VISIBILITY_TIMEOUT', int(os.getenv("JOBS_VISIBILITY_TIMEOUT", 300)))
+    app.config.setdefault('JOBS_RETRY_BACKOFF', float(os.getenv("JOBS_RETRY_BACKOFF", 5)))
+    app.config.setdefault('JOBS_MAX_RUNNING_PER_USER', int(os.getenv("JOBS_MAX_RUNNING_PER_USER", 2)))
+    app.config.setdefault('JOBS_MAX_PENDING_PER_USER', int(os.getenv("JOBS_MAX_PENDING_PER_USER", 20)))
+    app.config.setdefault('JOBS_RETENTION_HOURS', int(os.getenv("JOBS_RETENTION_HOURS", 24)))
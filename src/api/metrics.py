@@ -0,0 +1,246 @@
+"""
+Instrumentación por petición del blueprint `api`: latencia, número y tiempo de sentencias SQL,
+tamaño de respuesta y latencia de llamadas salientes (QuickChart), expuestas en formato de
+texto de Prometheus en /metrics.
+
+Con varios workers de gunicorn cada proceso lleva sus propias series. Si METRICS_DIR está definido
+(gunicorn.conf.py lo define), cada proceso vuelca las suyas a un fichero de ese directorio desde un
+hilo cada METRICS_FLUSH_SECONDS (si hubo peticiones) y al salir, y /metrics devuelve la suma de todos: los
+contadores no retroceden aunque cada scrape lo atienda un worker distinto o un worker se recicle.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from uuid import uuid4
+from bisect import bisect_left
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from api.utils import APIException
+
+logger = logging.getLogger("api.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+MAX_LOGGED_STATEMENTS = 50
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            counts, total = self._series.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._series[label_values] = (counts, total + value)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(label_values), [list(counts), total]] for label_values, (counts, total) in self._series.items()]
+
+    @staticmethod
+    def merge(series, value):
+        counts, total = series or ([0] * len(value[0]), 0.0)
+        return [a + b for a, b in zip(counts, value[0])], total + value[1]
+
+    def expose(self, series=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        if series is None:
+            with self._lock:
+                series = dict(self._series)
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name, self.help, self.labels = name, help, labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(label_values), value] for label_values, value in self._series.items()]
+
+    @staticmethod
+    def merge(series, value):
+        return (series or 0) + value
+
+    def expose(self, series=None):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        if series is None:
+            with self._lock:
+                series = dict(self._series)
+        for label_values, value in sorted(series.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+REQUESTS = Counter("api_requests_total", "Peticiones atendidas", ("endpoint", "method", "status"))
+LATENCY = Histogram("api_request_duration_seconds", "Latencia de la petición", ("endpoint", "method"), LATENCY_BUCKETS)
+SQL_STATEMENTS = Histogram("api_request_sql_statements", "Sentencias SQL por petición", ("endpoint",), COUNT_BUCKETS)
+SQL_TIME = Histogram("api_request_sql_duration_seconds", "Tiempo total en SQL por petición", ("endpoint",), LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("api_response_size_bytes", "Tamaño del cuerpo de la respuesta", ("endpoint",), SIZE_BUCKETS)
+OUTBOUND = Histogram("api_outbound_request_duration_seconds", "Latencia de llamadas a servicios externos",
+                     ("service", "outcome"), LATENCY_BUCKETS)
+TRANSACTION_CACHE = Counter("api_transaction_cache_total", "Lecturas de la caché de transacciones", ("result",))
+ALL_METRICS = (REQUESTS, LATENCY, SQL_STATEMENTS, SQL_TIME, RESPONSE_SIZE, OUTBOUND, TRANSACTION_CACHE)
+
+
+_flush = {"pid": None, "file": None, "dirty": False, "thread_pid": None}
+_flush_lock = threading.Lock()
+
+
+def flush_metrics(metrics_dir):
+    """Vuelca las series de este proceso a su fichero de `metrics_dir` (reemplazo atómico)."""
+    with _flush_lock:
+        if _flush["pid"] != os.getpid():  # Cada proceso (también tras un fork) escribe en su propio fichero
+            _flush["pid"], _flush["file"] = os.getpid(), f"{os.getpid()}-{uuid4().hex[:8]}.json"
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, _flush["file"])
+        with open(path + ".tmp", "w") as output:
+            json.dump({metric.name: metric.snapshot() for metric in ALL_METRICS}, output)
+        os.replace(path + ".tmp", path)
+        _flush["dirty"] = False
+
+
+def _schedule_flush(metrics_dir, interval):
+    """Marca que hay datos sin volcar y arranca, una vez por proceso, el hilo que los vuelca."""
+    _flush["dirty"] = True
+    if _flush["thread_pid"] == os.getpid():
+        return
+    _flush["thread_pid"] = os.getpid()
+
+    def flush_periodically():
+        while True:
+            time.sleep(interval)
+            if _flush["dirty"]:
+                flush_metrics(metrics_dir)
+
+    threading.Thread(target=flush_periodically, name="metrics-flush", daemon=True).start()
+
+
+def collect_metrics(metrics_dir):
+    """Suma las series de todos los procesos que han volcado en `metrics_dir`."""
+    merged = {metric.name: {} for metric in ALL_METRICS}
+    by_name = {metric.name: metric for metric in ALL_METRICS}
+    for name in os.listdir(metrics_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name)) as source:
+                dump = json.load(source)
+        except (OSError, ValueError):
+            continue
+        for metric_name, series in dump.items():
+            if metric_name not in by_name:
+                continue
+            for label_values, value in series:
+                key = tuple(label_values)
+                merged[metric_name][key] = by_name[metric_name].merge(merged[metric_name].get(key), value)
+    return merged
+
+
+def observe_outbound(service, seconds, outcome="ok"):
+    OUTBOUND.observe(seconds, service, outcome)
+
+
+def _tracking():
+    return has_request_context() and "metrics_start" in g
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _tracking():
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts or not _tracking():
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    g.metrics_sql_count += 1
+    g.metrics_sql_time += elapsed
+    if len(g.metrics_sql_statements) < MAX_LOGGED_STATEMENTS:
+        g.metrics_sql_statements.append((elapsed, statement))
+
+
+def setup_metrics(app):
+    app.config.setdefault('METRICS_TOKEN', os.getenv("METRICS_TOKEN"))
+    app.config.setdefault('SLOW_REQUEST_SECONDS', float(os.getenv("SLOW_REQUEST_SECONDS", 1)))
+    app.config.setdefault('METRICS_DIR', os.getenv("METRICS_DIR"))
+    app.config.setdefault('METRICS_FLUSH_SECONDS', float(os.getenv("METRICS_FLUSH_SECONDS", 1)))
+    metrics_dir = app.config['METRICS_DIR']
+    if metrics_dir:
+        atexit.register(lambda: _flush["thread_pid"] == os.getpid() and flush_metrics(metrics_dir))
+
+    @app.before_request
+    def start_request_metrics():
+        if request.blueprint == "api":
+            g.metrics_start = time.perf_counter()
+            g.metrics_sql_count, g.metrics_sql_time, g.metrics_sql_statements = 0, 0.0, []
+
+    @app.after_request
+    def capture_response_metrics(response):
+        if "metrics_start" in g:
+            g.metrics_status = response.status_code
+            g.metrics_size = response.calculate_content_length()
+        return response
+
+    # En teardown para incluir el SQL que se ejecuta mientras se envía una respuesta en streaming
+    @app.teardown_request
+    def record_request_metrics(error=None):
+        if "metrics_start" not in g:
+            return
+        elapsed = time.perf_counter() - g.pop("metrics_start")
+        endpoint, method = request.endpoint, request.method
+        status = g.get("metrics_status", 500)
+        REQUESTS.inc(endpoint, method, str(status))
+        LATENCY.observe(elapsed, endpoint, method)
+        SQL_STATEMENTS.observe(g.metrics_sql_count, endpoint)
+        SQL_TIME.observe(g.metrics_sql_time, endpoint)
+        if g.get("metrics_size") is not None:
+            RESPONSE_SIZE.observe(g.metrics_size, endpoint)
+        if metrics_dir:
+            _schedule_flush(metrics_dir, app.config['METRICS_FLUSH_SECONDS'])
+
+        if elapsed >= app.config['SLOW_REQUEST_SECONDS']:
+            statements = "\n".join(f"  {seconds * 1000:.1f} ms  {' '.join(sql.split())}"
+                                   for seconds, sql in g.metrics_sql_statements)
+            logger.warning("Petición lenta %s %s -> %s en %.3f s; %d sentencias SQL (%.3f s):\n%s",
+                           method, request.path, status, elapsed, g.metrics_sql_count, g.metrics_sql_time, statements)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            raise APIException("No autorizado", status_code=401)
+        if metrics_dir:
+            flush_metrics(metrics_dir)
+            merged = collect_metrics(metrics_dir)
+            lines = [line for metric in ALL_METRICS for line in metric.expose(merged[metric.name])]
+        else:
+            lines = [line for metric in ALL_METRICS for line in metric.expose()]
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -1,8 +1,129 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import func, cast, Integer, insert, delete
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, date, timedelta
 import calendar
+from api.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Granularidades admitidas por el gráfico y el título del eje X de cada una
+CHART_GRANULARITIES = {
+    "day": "Días",
+    "week": "Semanas",
+    "month": "Meses",
+    "quarter": "Trimestres",
+    "year": "Años",
+}
+MAX_CHART_BUCKETS = 1000
+
+
+def truncate_date_sql(column, granularity, dialect):
+    """Expresión SQL que trunca `column` al inicio del periodo (date_trunc en Postgres, strftime en SQLite)."""
+    if dialect == "postgresql":
+        return func.date_trunc(granularity, column)
+    if granularity == "day":
+        return func.date(column)
+    if granularity == "week":
+        # Lunes de la semana ISO: avanzar al domingo y retroceder 6 días
+        return func.date(column, "weekday 0", "-6 days")
+    if granularity == "month":
+        return func.strftime("%Y-%m-01", column)
+    if granularity == "quarter":
+        quarter_month = (cast(func.strftime("%m", column), Integer) - 1) // 3 * 3 + 1
+        return func.printf("%s-%02d-01", func.strftime("%Y", column), quarter_month)
+    return func.strftime("%Y-01-01", column)
+
+
+def truncate_date(value, granularity):
+    """Equivalente en Python de truncate_date_sql."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "month":
+        return value.replace(day=1)
+    if granularity == "quarter":
+        return date(value.year, (value.month - 1) // 3 * 3 + 1, 1)
+    if granularity == "year":
+        return date(value.year, 1, 1)
+    return value
+
+
+def next_period(value, granularity):
+    """Inicio del periodo siguiente a `value` (que ya debe estar truncado)."""
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(weeks=1)
+    months = {"month": 1, "quarter": 3, "year": 12}[granularity]
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def fill_chart_buckets(rows, granularity, start=None, end=None):
+    """
+    Convierte filas (periodo, tipo, total) agregadas en SQL en una lista ordenada de
+    (inicio_del_periodo, {"income": x, "expense": y}) sin huecos entre start y end.
+    """
+    if not rows:
+        return []
+
+    totals = {}
+    for period, transaction_type, amount in rows:
+        period = truncate_date(date.fromisoformat(period) if isinstance(period, str) else period, granularity)
+        totals.setdefault(period, {"income": 0, "expense": 0})[transaction_type] += amount
+
+    # Rellenar los periodos sin transacciones para que el eje X sea continuo
+    first = truncate_date(start, granularity) if start else min(totals)
+    last = truncate_date(end, granularity) if end else max(totals)
+    buckets = []
+    period = first
+    while period <= last:
+        if len(buckets) >= MAX_CHART_BUCKETS:
+            raise ValueError(f"El rango pedido supera los {MAX_CHART_BUCKETS} periodos")
+        buckets.append((period, totals.get(period, {"income": 0, "expense": 0})))
+        period = next_period(period, granularity)
+    return buckets
+
+
+def upsert_increment(table, keys, increments):
+    """
+    Suma `increments` a la fila de `table` identificada por `keys` (su clave primaria), creándola si no existe.
+    Es un único INSERT ... ON CONFLICT DO UPDATE en Postgres y SQLite.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(table).values(**keys, **increments)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[table.c[column] for column in keys],
+            set_={column: table.c[column] + upsert.excluded[column] for column in increments},
+        )
+        db.session.execute(upsert)
+        return
+
+    result = db.session.execute(
+        table.update()
+        .where(*[table.c[column] == value for column, value in keys.items()])
+        .values(**{column: table.c[column] + value for column, value in increments.items()})
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(**keys, **increments))
+
+
+def period_label(value, granularity):
+    """Etiqueta legible de un periodo para el eje X."""
+    if granularity == "day":
+        return value.isoformat()
+    if granularity == "week":
+        year, week, _ = value.isocalendar()
+        return f"{year}-S{week:02d}"
+    if granularity == "month":
+        return f"{calendar.month_name[value.month]} {value.year}"
+    if granularity == "quarter":
+        return f"T{(value.month - 1) // 3 + 1} {value.year}"
+    return str(value.year)
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -22,12 +143,16 @@ class User(db.Model):
     employees = db.relationship('Employee', backref='user', lazy=True)
 
     def set_password(self, password):
-        from werkzeug.security import generate_password_hash
-        self.password_hash = generate_password_hash(password)
+        from api.passwords import hash_password
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        from werkzeug.security import check_password_hash
-        return check_password_hash(self.password_hash, password)
+        from api.passwords import verify_password
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        from api.passwords import needs_rehash
+        return needs_rehash(self.password_hash)
 
     def serialize(self):
         return {
@@ -42,6 +167,9 @@ class User(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_user_id_date_id', 'user_id', 'date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -64,23 +192,27 @@ class Transaction(db.Model):
         }
 
     @staticmethod
-    def transform_for_chart(transactions):
-        """Transforma las transacciones al formato de QuickChart para un gráfico comparativo."""
-        # Ordenar transacciones por fecha
-        transactions = sorted(transactions, key=lambda t: t.date)
-
-        # Agrupar transacciones por mes
-        data = {}
-        for t in transactions:
-            month = t.date.strftime('%B')  # Nombre del mes en texto
-            if month not in data:
-                data[month] = {"income": 0, "expense": 0}
-            data[month][t.transaction_type] += t.amount
-
-        # Preparar los datos para QuickChart
-        labels = list(data.keys())  # Etiquetas (meses)
-        income_data = [data[label]["income"] for label in labels]
-        expense_data = [data[label]["expense"] for label in labels]
+    def chart_totals(query, granularity="month", start=None, end=None):
+        """
+        Agrupa en SQL las transacciones de `query` por periodo y tipo.
+        Devuelve el mismo formato que fill_chart_buckets.
+        """
+        dialect = db.session.get_bind().dialect.name
+        bucket = truncate_date_sql(Transaction.date, granularity, dialect).label("bucket")
+        rows = (
+            query.filter(Transaction.transaction_type.in_(("income", "expense")))
+            .with_entities(bucket, Transaction.transaction_type, func.sum(Transaction.amount))
+            .group_by(bucket, Transaction.transaction_type)
+            .all()
+        )
+        return fill_chart_buckets(rows, granularity, start, end)
+
+    @staticmethod
+    def transform_for_chart(totals, granularity="month"):
+        """Transforma los totales de chart_totals al formato de QuickChart para un gráfico comparativo."""
+        labels = [period_label(period, granularity) for period, _ in totals]
+        income_data = [values["income"] for _, values in totals]
+        expense_data = [values["expense"] for _, values in totals]
         profit_data = [income - expense for income, expense in zip(income_data, expense_data)]
 
         # Estructura de QuickChart
@@ -88,7 +220,7 @@ class Transaction(db.Model):
             "chart": {
                 "type": "bar",
                 "data": {
-                    "labels": labels,  # Etiquetas (meses)
+                    "labels": labels,  # Etiquetas (periodos)
                     "datasets": [
                         {
                             "label": "Ingresos",
@@ -152,7 +284,7 @@ class Transaction(db.Model):
                         "x": {
                             "title": {
                                 "display": True,
-                                "text": "Meses",
+                                "text": CHART_GRANULARITIES[granularity],
                                 "color": "#ffffff",  # Blanco
                                 "font": {
                                     "size": 14,
@@ -170,9 +302,182 @@ class Transaction(db.Model):
         }
 
 
+# Columnas de una transacción que determinan su aportación a los totales mensuales
+ROLLUP_COLUMNS = ("user_id", "amount", "date", "transaction_type", "status")
+
+
+class TransactionRollup(db.Model):
+    """Totales mensuales de transacciones por usuario, tipo y estado, mantenidos en cada escritura."""
+    __tablename__ = 'transaction_rollups'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    period = db.Column(db.Date, primary_key=True)  # Primer día del mes
+    transaction_type = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    amount = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def key_for(transaction):
+        """Bucket (user_id, period, transaction_type, status) al que pertenece una transacción."""
+        return (int(transaction.user_id), truncate_date(transaction.date, "month"), transaction.transaction_type, transaction.status)
+
+    @staticmethod
+    def apply(key, amount, count):
+        """Suma amount/count al bucket `key` con un upsert atómico dentro de la transacción actual."""
+        user_id, period, transaction_type, status = key
+        upsert_increment(
+            TransactionRollup.__table__,
+            {"user_id": user_id, "period": period, "transaction_type": transaction_type, "status": status},
+            {"amount": amount, "count": count},
+        )
+
+    @staticmethod
+    def add(transaction):
+        TransactionRollup.apply(TransactionRollup.key_for(transaction), float(transaction.amount), 1)
+
+    @staticmethod
+    def remove(transaction):
+        TransactionRollup.apply(TransactionRollup.key_for(transaction), -float(transaction.amount), -1)
+
+    @staticmethod
+    def apply_rows(added=(), removed=()):
+        """
+        Suma las filas `added` y resta las `removed` (con las columnas de ROLLUP_COLUMNS) agrupando por
+        bucket, con un upsert por bucket afectado en lugar de uno por fila.
+        """
+        totals = {}
+        for rows, sign in ((added, 1), (removed, -1)):
+            for row in rows:
+                key = TransactionRollup.key_for(row)
+                amount, count = totals.get(key, (0.0, 0))
+                totals[key] = (amount + sign * float(row.amount), count + sign)
+        for key, (amount, count) in totals.items():
+            if count or amount:
+                TransactionRollup.apply(key, amount, count)
+
+    @staticmethod
+    def move(old_key, old_amount, transaction):
+        """Traslada una transacción modificada de su bucket anterior al nuevo."""
+        new_key = TransactionRollup.key_for(transaction)
+        if new_key == old_key and float(transaction.amount) == float(old_amount):
+            return
+        TransactionRollup.apply(old_key, -float(old_amount), -1)
+        TransactionRollup.add(transaction)
+
+    @staticmethod
+    def rebuild():
+        """Recalcula la tabla completa a partir de `transactions`."""
+        dialect = db.session.get_bind().dialect.name
+        period = truncate_date_sql(Transaction.date, "month", dialect)
+        if dialect == "postgresql":
+            period = cast(period, db.Date)
+        totals = (
+            db.select(Transaction.user_id, period, Transaction.transaction_type, Transaction.status,
+                      func.sum(Transaction.amount), func.count())
+            .group_by(Transaction.user_id, period, Transaction.transaction_type, Transaction.status)
+        )
+        table = TransactionRollup.__table__
+        db.session.execute(delete(table))
+        db.session.execute(insert(table).from_select(
+            ["user_id", "period", "transaction_type", "status", "amount", "count"], totals))
+
+    @staticmethod
+    def chart_totals(user_id, granularity="month", start=None):
+        """
+        Igual que Transaction.chart_totals pero leyendo los totales mensuales, en O(periodos).
+        Solo vale para granularidad month/quarter/year y un start que caiga en día 1.
+        """
+        dialect = db.session.get_bind().dialect.name
+        bucket = truncate_date_sql(TransactionRollup.period, granularity, dialect).label("bucket")
+        query = TransactionRollup.query.filter(
+            TransactionRollup.user_id == int(user_id),
+            TransactionRollup.count > 0,
+            TransactionRollup.transaction_type.in_(("income", "expense")),
+        )
+        if start:
+            query = query.filter(TransactionRollup.period >= truncate_date(start, "month"))
+        rows = (
+            query.with_entities(bucket, TransactionRollup.transaction_type, func.sum(TransactionRollup.amount))
+            .group_by(bucket, TransactionRollup.transaction_type)
+            .all()
+        )
+        return fill_chart_buckets(rows, granularity, start)
+
+class DataVersion(db.Model):
+    """Contador por usuario y recurso que se incrementa en cada escritura; alimenta los ETag de los listados."""
+    __tablename__ = 'data_versions'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    resource = db.Column(db.String(50), primary_key=True)  # 'transactions', 'employees', 'projects', 'budgets', 'payments'
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def bump(user_id, *resources):
+        for resource in resources:
+            upsert_increment(DataVersion.__table__, {"user_id": int(user_id), "resource": resource}, {"version": 1})
+
+    @staticmethod
+    def current(user_id, resource):
+        version = db.session.execute(
+            db.select(DataVersion.version).where(DataVersion.user_id == int(user_id), DataVersion.resource == resource)
+        ).scalar()
+        return version or 0
+
+
+class Job(db.Model):
+    """Trabajo en segundo plano (gráficos, exportaciones, importaciones) que ejecuta `flask worker`."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        db.Index('ix_jobs_user_id_status', 'user_id', 'status'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)  # 'chart', 'export', 'import'
+    status = db.Column(db.String(50), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    payload = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # No se reclama antes (reintentos)
+    locked_by = db.Column(db.String(64), nullable=True)  # Token del intento en curso
+    locked_until = db.Column(db.DateTime, nullable=True)  # Fin del plazo de visibilidad del intento en curso
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobFile(db.Model):
+    """
+    Fichero de un trabajo (subida de una importación o resultado de una exportación) guardado por trozos
+    en la base de datos: web y worker pueden ser máquinas distintas sin disco compartido.
+    """
+    __tablename__ = 'job_files'
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id'), primary_key=True)
+    name = db.Column(db.String(20), primary_key=True)  # 'upload', 'result'
+    seq = db.Column(db.Integer, primary_key=True)  # Orden del trozo dentro del fichero
+    data = db.Column(db.LargeBinary, nullable=False)
+
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_user_id_date_id', 'user_id', 'date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -192,6 +497,9 @@ class Payment(db.Model):
 
 class Employee(db.Model):
     __tablename__ = 'employees'
+    __table_args__ = (
+        db.Index('ix_employees_user_id_id', 'user_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(120), nullable=False)
@@ -209,6 +517,9 @@ class Employee(db.Model):
 
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_user_id_id', 'user_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     name = db.Column(db.String(120), nullable=False)
@@ -233,6 +544,9 @@ class Project(db.Model):
 
 class Budget(db.Model):
     __tablename__ = 'budgets'
+    __table_args__ = (
+        db.Index('ix_budgets_user_id_date_id', 'user_id', 'date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
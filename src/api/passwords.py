@@ -0,0 +1,143 @@
+"""
+Hash de contraseñas fuera del worker web: se ejecuta en un pool de procesos acotado y de menor prioridad,
+con algoritmo y coste configurables (PASSWORD_HASH_METHOD) y detección de hashes que hay que actualizar.
+
+Como mucho PASSWORD_HASH_MAX_CONCURRENT hashes a la vez en toda la máquina, no por worker de gunicorn:
+cada hash ocupa una de esas plazas, que son bloqueos de fichero (lockf) en PASSWORD_HASH_LOCK_DIR
+compartidos por todos los procesos. Quien no consigue plaza en PASSWORD_HASH_QUEUE_TIMEOUT recibe 503,
+así una ráfaga de logins no deja a todos los workers web esperando y el resto de peticiones sigue
+atendiéndose. Un proceso que muere libera su plaza. Sin fcntl (Windows) el límite es por proceso.
+"""
+import os
+import time
+import random
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
+from api.utils import APIException
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pool_lock = threading.Lock()
+_held = set()  # Plazas retenidas por hilos de este proceso: lockf no distingue hilos de un mismo proceso
+_prefixes = {}
+
+
+def _lower_priority():
+    # El hash compite por CPU con el resto de peticiones: que ceda ante ellas
+    try:
+        os.nice(5)
+    except OSError:
+        pass
+
+
+def _get_pool():
+    """Pool por proceso; tras un fork (workers de gunicorn) se crea de nuevo."""
+    global _pool, _pool_pid, _slots
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=current_app.config['PASSWORD_HASH_WORKERS'],
+                                        initializer=_lower_priority)
+            _slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_MAX_CONCURRENT'])
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _acquire_slot(limit, timeout):
+    """
+    Bloquea una de las `limit` plazas compartidas. Devuelve (plaza, descriptor) o None. Se usa lockf y no
+    flock porque los bloqueos de lockf no los heredan los procesos del pool, que se crean por fork.
+    """
+    if fcntl is None:
+        return _slots if _slots.acquire(timeout=timeout) else None
+
+    lock_dir = current_app.config['PASSWORD_HASH_LOCK_DIR']
+    os.makedirs(lock_dir, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        for slot in random.sample(range(limit), limit):
+            with _pool_lock:
+                if slot in _held:
+                    continue
+                _held.add(slot)
+            fd = os.open(os.path.join(lock_dir, f"slot-{slot}"), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot, fd
+            except OSError:
+                os.close(fd)
+                with _pool_lock:
+                    _held.discard(slot)
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.01)
+
+
+def _release_slot(slot):
+    if fcntl is None:
+        slot.release()
+        return
+    slot, fd = slot
+    os.close(fd)  # Cerrar el descriptor suelta el bloqueo
+    with _pool_lock:
+        _held.discard(slot)
+
+
+def _run(fn, *args):
+    if not current_app.config['PASSWORD_HASH_WORKERS']:
+        return fn(*args)
+
+    pool = _get_pool()
+    # Sin plaza libre se rechaza enseguida en lugar de bloquear el worker
+    slot = _acquire_slot(current_app.config['PASSWORD_HASH_MAX_CONCURRENT'],
+                         current_app.config['PASSWORD_HASH_QUEUE_TIMEOUT'])
+    if slot is None:
+        raise APIException("Servidor ocupado, inténtalo de nuevo en unos segundos", status_code=503,
+                           payload={"retry_after": 1})
+    try:
+        return pool.submit(fn, *args).result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except FutureTimeoutError:
+        raise APIException("Tiempo de espera agotado al procesar la contraseña", status_code=503)
+    finally:
+        _release_slot(slot)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True si el hash no usa el método y coste configurados ahora mismo."""
+    return password_hash.split("$", 1)[0] != configured_prefix()
+
+
+def configured_prefix():
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in _prefixes:
+        # werkzeug completa los parámetros por defecto ("scrypt" -> "scrypt:32768:8:1")
+        _prefixes[method] = generate_password_hash("", method, salt_length=1).split("$", 1)[0]
+    return _prefixes[method]
+
+
+def setup_passwords(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', os.getenv("PASSWORD_HASH_METHOD", "scrypt"))
+    app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.getenv("PASSWORD_HASH_WORKERS", min(2, os.cpu_count() or 1))))
+    # Hashes simultáneos en toda la máquina; por defecto los mismos que procesos de hash de un worker
+    app.config.setdefault('PASSWORD_HASH_MAX_CONCURRENT', int(os.getenv("PASSWORD_HASH_MAX_CONCURRENT",
+                                                                        app.config['PASSWORD_HASH_WORKERS'] or 1)))
+    app.config.setdefault('PASSWORD_HASH_LOCK_DIR', os.getenv("PASSWORD_HASH_LOCK_DIR",
+                                                              os.path.join(tempfile.gettempdir(), "password-hash-slots")))
+    app.config.setdefault('PASSWORD_HASH_QUEUE_TIMEOUT', float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 0.5)))
+    app.config.setdefault('PASSWORD_HASH_TIMEOUT', float(os.getenv("PASSWORD_HASH_TIMEOUT", 10)))
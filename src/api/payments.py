@@ -0,0 +1,30 @@
+"""
+Liquidación masiva de pagos: marca como pagados los pendientes que cumplen un filtro (destinatario,
+rango de fechas y/o lista de ids) con un único UPDATE ... RETURNING, sin cargar filas en el ORM.
+"""
+import math
+from api.models import db, Payment, DataVersion
+from api.utils import owned_bulk_update
+from api.bulk import parse_filters
+
+PAYMENT_STATUSES = ("pending", "paid")
+
+
+def parse_settle_filters(data, max_ids):
+    """Valida el cuerpo de POST /payments/settle. Devuelve las condiciones WHERE del filtro."""
+    return parse_filters(Payment, data, ("recipient",), max_ids)
+
+
+def settle_payments(user_id, conditions):
+    """Marca como pagados los pagos pendientes del usuario que cumplen `conditions` y confirma."""
+    pending = Payment.__table__.c.status == "pending"
+    rows = [row for row, _ in owned_bulk_update(Payment, user_id, (pending, *conditions), {"status": "paid"},
+                                                 ("id", "amount"))]
+    if rows:
+        DataVersion.bump(user_id, 'payments')
+    db.session.commit()
+    return {
+        "settled": len(rows),
+        "ids": sorted(row.id for row in rows),
+        "total_amount": math.fsum(row.amount for row in rows),
+    }
@@ -0,0 +1,188 @@
+"""
+Cliente de QuickChart: sesión HTTP compartida (keep-alive, timeouts y reintentos acotados),
+caché de respuestas direccionada por contenido y colapso de peticiones idénticas concurrentes.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app
+from api.metrics import observe_outbound
+
+
+def chart_key(chart_data):
+    """Hash estable del payload del gráfico; dos payloads iguales dan la misma clave."""
+    payload = json.dumps(chart_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class MemoryChartCache:
+    """Caché LRU en memoria del proceso con caducidad (TTL) por entrada."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisChartCache:
+    """Caché compartida entre workers e instancias. Requiere el paquete `redis`."""
+
+    def __init__(self, url, prefix="quickchart:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("QUICKCHART_CACHE_URL requiere instalar el paquete 'redis'")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl))
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QuickChartClient:
+    def __init__(self, base_url, cache, cache_ttl=300, connect_timeout=3.05, read_timeout=10,
+                 retries=2, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.pool_size = pool_size
+        self._session = None
+        self._session_pid = None
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Una sesión por proceso: las conexiones heredadas por fork no se comparten entre workers
+        if self._session is None or self._session_pid != os.getpid():
+            retry = Retry(
+                total=self.retries,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["POST"]),
+                raise_on_status=False,
+            )
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def create_chart(self, chart_data):
+        """Devuelve la respuesta de /chart/create, desde caché si el mismo payload ya se pidió."""
+        key = chart_key(chart_data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+
+        if not leader:
+            # Otra petición ya está pidiendo este mismo gráfico: esperar su resultado
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        started = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}/chart/create", json=chart_data, timeout=self.timeout)
+            response.raise_for_status()
+            call.result = response.json()
+            observe_outbound("quickchart", time.perf_counter() - started)
+            self.cache.set(key, call.result, self.cache_ttl)
+            return call.result
+        except Exception as e:
+            observe_outbound("quickchart", time.perf_counter() - started, "error")
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            call.done.set()
+
+
+def setup_quickchart(app):
+    """Configura el renderizador de gráficos: QuickChart (por defecto) o local con CHART_RENDERER=local."""
+    app.config.setdefault('CHART_RENDERER', os.getenv("CHART_RENDERER", "quickchart"))
+    app.config.setdefault('QUICKCHART_URL', os.getenv("QUICKCHART_URL", "https://quickchart.io"))
+    app.config.setdefault('QUICKCHART_CACHE_URL', os.getenv("QUICKCHART_CACHE_URL"))
+    app.config.setdefault('QUICKCHART_CACHE_SIZE', int(os.getenv("QUICKCHART_CACHE_SIZE", 256)))
+    app.config.setdefault('QUICKCHART_CACHE_TTL', int(os.getenv("QUICKCHART_CACHE_TTL", 300)))
+    app.config.setdefault('QUICKCHART_CONNECT_TIMEOUT', float(os.getenv("QUICKCHART_CONNECT_TIMEOUT", 3.05)))
+    app.config.setdefault('QUICKCHART_READ_TIMEOUT', float(os.getenv("QUICKCHART_READ_TIMEOUT", 10)))
+    app.config.setdefault('QUICKCHART_RETRIES', int(os.getenv("QUICKCHART_RETRIES", 2)))
+
+    if app.config['QUICKCHART_CACHE_URL']:
+        cache = RedisChartCache(app.config['QUICKCHART_CACHE_URL'])
+    else:
+        cache = MemoryChartCache(app.config['QUICKCHART_CACHE_SIZE'])
+
+    if app.config['CHART_RENDERER'] == "local":
+        from api.chart_renderer import LocalChartRenderer
+        app.extensions['chart_renderer'] = LocalChartRenderer(cache, cache_ttl=app.config['QUICKCHART_CACHE_TTL'])
+        return
+
+    app.extensions['chart_renderer'] = QuickChartClient(
+        app.config['QUICKCHART_URL'],
+        cache,
+        cache_ttl=app.config['QUICKCHART_CACHE_TTL'],
+        connect_timeout=app.config['QUICKCHART_CONNECT_TIMEOUT'],
+        read_timeout=app.config['QUICKCHART_READ_TIMEOUT'],
+        retries=app.config['QUICKCHART_RETRIES'],
+    )
+
+
+def get_chart_renderer():
+    return current_app.extensions['chart_renderer']
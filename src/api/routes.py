@@ -1,9 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
-from api.models import db, User, Transaction, Payment, Employee, Project, Budget
-from api.utils import APIException
+from api.models import db, User, Transaction, TransactionRollup, DataVersion, Payment, Employee, Project, Budget, Job, JobFile, ROLLUP_COLUMNS
+from api.utils import (APIException, paginate, parse_limit, versioned, owned_update, owned_delete, serialize_row,
+                       parse_date, parse_date_range)
+from api.bulk_import import import_transactions, reader_for
+from api.batch import run_batch
+from api.summary import build_summary
+from api.analytics import STATUS_CODES, analyze
+from api.transaction_cache import get_columns, stage_patch
+from api.charts import parse_chart_args, build_chart
+from api.export import parse_export_args, export_filename, export_mimetype, export_stream
+from api.jobs import enqueue, iter_job_file, job_file_exists
+from api.payments import PAYMENT_STATUSES, parse_settle_filters, settle_payments
+from api.bulk import TRUE_VALUES, bulk_update, bulk_delete
+from api.search import search, DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
 from datetime import datetime
-import requests
+from sqlalchemy.exc import IntegrityError
 
 api = Blueprint('api', __name__)
 
@@ -20,6 +32,11 @@ def login():
     if not user or not user.check_password(data['password']):
         raise APIException("Credenciales inválidas", status_code=401)
 
+    # Actualizar el hash si se guardó con otro algoritmo o coste
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+
     access_token = create_access_token(identity=str(user.id))
     return jsonify({"token": access_token, "user_id": user.id}), 200
 
@@ -47,13 +64,11 @@ def register():
 @api.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
-    users = User.query.all()
-    return jsonify([user.serialize() for user in users]), 200
+    return paginate(User.query, (User.id,))
 
 @api.route('/users/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
-    print(f"ID recibido user: {user_id}")
     user = User.query.get(user_id)
     if not user:
         raise APIException("Usuario no encontrado", status_code=404)
@@ -83,6 +98,11 @@ def delete_user(user_id):
     if not user:
         raise APIException("Usuario no encontrado", status_code=404)
 
+    # Tablas internas que referencian al usuario: no tienen relación en el ORM que las borre
+    JobFile.query.filter(JobFile.job_id.in_(db.select(Job.id).where(Job.user_id == user_id))) \
+        .delete(synchronize_session=False)
+    for model in (DataVersion, TransactionRollup, Job):
+        model.query.filter_by(user_id=user_id).delete(synchronize_session=False)
     db.session.delete(user)
     db.session.commit()
     return jsonify({"message": f"Usuario con ID {user_id} eliminado correctamente"}), 200
@@ -105,54 +125,109 @@ def create_transaction():
         date=datetime.utcnow()
     )
     db.session.add(transaction)
+    TransactionRollup.add(transaction)
+    DataVersion.bump(user_id, 'transactions')
+    stage_patch(user_id, upsert=transaction)
     db.session.commit()
     return jsonify(transaction.serialize()), 201
 
 @api.route('/transactions', methods=['GET'])
 @jwt_required()
+@versioned('transactions')
 def get_transactions():
     user_id = get_jwt_identity()
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    return jsonify([transaction.serialize() for transaction in transactions]), 200
+    query = Transaction.query.filter_by(user_id=user_id)
+    return paginate(query, (Transaction.date, Transaction.id))
+
+def bulk_update_view(resource):
+    """PATCH por filtro: {"filter": {...}, "changes": {...}, "dry_run": false}."""
+    user_id = get_jwt_identity()
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get("filter", {}), dict):
+        raise APIException("Se esperaba un objeto JSON con filter y changes", status_code=400)
+
+    dry_run = body.get("dry_run") in TRUE_VALUES or request.args.get("dry_run") in TRUE_VALUES
+    result = bulk_update(resource, user_id, body.get("filter", {}), body.get("changes"), dry_run,
+                         current_app.config.get('BULK_MAX_IDS', 10000))
+    return jsonify(result), 200
+
+def bulk_delete_view(resource):
+    """DELETE por filtro: en la query string (?status=pending&ids=1,2) o en un cuerpo JSON {"filter": {...}}."""
+    user_id = get_jwt_identity()
+    body = request.get_json(silent=True) if request.is_json else None
+    filters = body["filter"] if isinstance(body, dict) and "filter" in body else request.args
+    if not hasattr(filters, "get"):
+        raise APIException("filter debe ser un objeto", status_code=400)
+
+    dry_run = request.args.get("dry_run") in TRUE_VALUES or (isinstance(body, dict) and body.get("dry_run") in TRUE_VALUES)
+    result = bulk_delete(resource, user_id, filters, dry_run, current_app.config.get('BULK_MAX_IDS', 10000))
+    return jsonify(result), 200
+
+@api.route('/transactions', methods=['PATCH'])
+@jwt_required()
+def bulk_update_transactions():
+    return bulk_update_view('transactions')
+
+@api.route('/transactions', methods=['DELETE'])
+@jwt_required()
+def bulk_delete_transactions():
+    return bulk_delete_view('transactions')
+
+def parse_import_args():
+    """Lector para el tipo de contenido de la petición y tamaño de lote de una importación."""
+    reader = reader_for(request.mimetype)
+    if reader is None:
+        raise APIException("El tipo de contenido debe ser text/csv o application/x-ndjson", status_code=415)
+
+    batch_size = request.args.get('batch_size', current_app.config.get('IMPORT_BATCH_SIZE', 5000), type=int)
+    if batch_size < 1:
+        raise APIException("El parámetro batch_size debe ser mayor que 0", status_code=400)
+    # Un lote se acumula en memoria antes de insertarse: se acota como parse_limit acota las páginas
+    return reader, min(batch_size, current_app.config.get('IMPORT_MAX_BATCH_SIZE', 20000))
+
+@api.route('/transactions/import', methods=['POST'])
+@jwt_required()
+def bulk_import_transactions():
+    user_id = get_jwt_identity()
+    reader, batch_size = parse_import_args()
+    return jsonify(import_transactions(user_id, reader(request.stream), batch_size)), 200
 
 @api.route('/transactions/<int:transaction_id>', methods=['PUT'])
 @jwt_required()
 def update_transaction(transaction_id):
     current_user_id = get_jwt_identity()
-    
-    transaction = Transaction.query.get(transaction_id)
-    if not transaction:
-        raise APIException("Transacción no encontrada", status_code=404)
-
-    if int(transaction.user_id) != int(current_user_id):
-        raise APIException("No tienes permiso para modificar esta transacción", status_code=403)
-
     data = request.json
 
-    transaction.amount = data.get("amount", transaction.amount)
-    transaction.description = data.get("description", transaction.description)
-    transaction.transaction_type = data.get("transaction_type", transaction.transaction_type)
-    transaction.status = data.get("status", transaction.status)
-    transaction.company = data.get("company", transaction.company)
-
+    changes = {field: data[field] for field in ("amount", "description", "transaction_type", "status", "company") if field in data}
     if "date" in data:
-        try:
-            transaction.date = datetime.strptime(data["date"], "%Y-%m-%d")
-        except ValueError:
-            raise APIException("Formato de fecha inválido. Debe ser 'YYYY-MM-DD'", status_code=400)
+        changes["date"] = parse_date(data["date"])
+
+    # Solo hace falta leer los valores anteriores si cambia el bucket o el importe de los totales mensuales
+    previous = ROLLUP_COLUMNS if set(changes) & set(ROLLUP_COLUMNS) else ()
+    row, old = owned_update(Transaction, transaction_id, current_user_id, changes, previous)
+    if row is None:
+        if db.session.execute(db.select(Transaction.id).where(Transaction.id == transaction_id)).first() is None:
+            raise APIException("Transacción no encontrada", status_code=404)
+        raise APIException("No tienes permiso para modificar esta transacción", status_code=403)
 
+    if old is not None:
+        TransactionRollup.move(TransactionRollup.key_for(old), old.amount, row)
+    DataVersion.bump(current_user_id, 'transactions')
+    stage_patch(current_user_id, upsert=row)
     db.session.commit()
-    return jsonify(transaction.serialize()), 200
+    return jsonify(serialize_row(Transaction, row)), 200
 
 @api.route('/transactions/<int:transaction_id>', methods=['DELETE'])
 @jwt_required()
 def delete_transaction(transaction_id):
     user_id = get_jwt_identity()
-    transaction = Transaction.query.get(transaction_id)
-    if not transaction or int(transaction.user_id) != int(user_id):
+    transaction = owned_delete(Transaction, transaction_id, user_id, ROLLUP_COLUMNS)
+    if transaction is None:
         raise APIException("Transacción no encontrada o no autorizada", status_code=403)
 
-    db.session.delete(transaction)
+    TransactionRollup.remove(transaction)
+    DataVersion.bump(user_id, 'transactions')
+    stage_patch(user_id, delete_id=transaction_id)
     db.session.commit()
     return jsonify({"message": f"Transacción con ID {transaction_id} eliminada correctamente"}), 200
 
@@ -171,41 +246,41 @@ def create_employee():
         position=data.get('position')
     )
     db.session.add(employee)
+    DataVersion.bump(user_id, 'employees')
     db.session.commit()
     return jsonify(employee.serialize()), 201
 
 @api.route('/employees', methods=['GET'])
 @jwt_required()
+@versioned('employees')
 def get_employees():
     user_id = get_jwt_identity()
-    employees = Employee.query.filter_by(user_id=user_id).all()
-    return jsonify([employee.serialize() for employee in employees]), 200
+    query = Employee.query.filter_by(user_id=user_id)
+    return paginate(query, (Employee.id,))
 
 @api.route('/employees/<int:employee_id>', methods=['PUT'])
 @jwt_required()
 def update_employee(employee_id):
     user_id = get_jwt_identity()
-    employee = Employee.query.get(employee_id)
-    if not employee or int(employee.user_id) != int(user_id):
-        raise APIException("Empleado no encontrado o no autorizado", status_code=403)
-
     data = request.json
-    employee.name = data.get("name", employee.name)
-    employee.salary = data.get("salary", employee.salary)
-    employee.position = data.get("position", employee.position)
+    changes = {field: data[field] for field in ("name", "salary", "position") if field in data}
+
+    row, _ = owned_update(Employee, employee_id, user_id, changes)
+    if row is None:
+        raise APIException("Empleado no encontrado o no autorizado", status_code=403)
 
+    DataVersion.bump(user_id, 'employees')
     db.session.commit()
-    return jsonify(employee.serialize()), 200
+    return jsonify(serialize_row(Employee, row)), 200
 
 @api.route('/employees/<int:employee_id>', methods=['DELETE'])
 @jwt_required()
 def delete_employee(employee_id):
     user_id = get_jwt_identity()
-    employee = Employee.query.get(employee_id)
-    if not employee or int(employee.user_id) != int(user_id):
+    if owned_delete(Employee, employee_id, user_id) is None:
         raise APIException("Empleado no encontrado o no autorizado", status_code=403)
 
-    db.session.delete(employee)
+    DataVersion.bump(user_id, 'employees')
     db.session.commit()
     return jsonify({"message": f"Empleado con ID {employee_id} eliminado correctamente"}), 200
 
@@ -226,46 +301,48 @@ def create_project():
         end_date=data.get('end_date')
     )
     db.session.add(project)
+    DataVersion.bump(user_id, 'projects')
     db.session.commit()
     return jsonify(project.serialize()), 201
 
 @api.route('/projects', methods=['GET'])
 @jwt_required()
+@versioned('projects')
 def get_projects():
     user_id = get_jwt_identity()
-    projects = Project.query.filter_by(user_id=user_id).all()
-    return jsonify([project.serialize() for project in projects]), 200
+    query = Project.query.filter_by(user_id=user_id)
+    return paginate(query, (Project.id,))
 
 @api.route('/projects/<int:project_id>', methods=['PUT'])
 @jwt_required()
 def update_project(project_id):
     user_id = get_jwt_identity()
-    project = Project.query.get(project_id)
-    if not project or int(project.user_id) != int(user_id):
-        raise APIException("Proyecto no encontrado o no autorizado", status_code=403)
-
     data = request.json
-    project.name = data.get("name", project.name)
-    project.description = data.get("description", project.description)
-    project.client = data.get("client", project.client)
+    changes = {field: data[field] for field in ("name", "description", "client") if field in data}
     if data.get("end_date"):
-        try:
-            project.end_date = datetime.strptime(data["end_date"], "%Y-%m-%d")
-        except ValueError:
-            raise APIException("Formato de fecha inválido. Debe ser 'YYYY-MM-DD'", status_code=400)
+        changes["end_date"] = parse_date(data["end_date"])
 
+    row, _ = owned_update(Project, project_id, user_id, changes)
+    if row is None:
+        raise APIException("Proyecto no encontrado o no autorizado", status_code=403)
+
+    DataVersion.bump(user_id, 'projects')
     db.session.commit()
-    return jsonify(project.serialize()), 200
+    return jsonify(serialize_row(Project, row)), 200
 
 @api.route('/projects/<int:project_id>', methods=['DELETE'])
 @jwt_required()
 def delete_project(project_id):
     user_id = get_jwt_identity()
-    project = Project.query.get(project_id)
-    if not project or int(project.user_id) != int(user_id):
+    try:
+        deleted = owned_delete(Project, project_id, user_id)
+    except IntegrityError:
+        db.session.rollback()
+        raise APIException("No se puede eliminar un proyecto con presupuestos asociados", status_code=409)
+    if deleted is None:
         raise APIException("Proyecto no encontrado o no autorizado", status_code=403)
 
-    db.session.delete(project)
+    DataVersion.bump(user_id, 'projects')
     db.session.commit()
     return jsonify({"message": f"Proyecto con ID {project_id} eliminado correctamente"}), 200
 
@@ -290,77 +367,279 @@ def create_budget():
         date=datetime.utcnow()
     )
     db.session.add(budget)
+    DataVersion.bump(user_id, 'budgets')
     db.session.commit()
     return jsonify(budget.serialize()), 201
 
 @api.route('/budgets', methods=['GET'])
 @jwt_required()
+@versioned('budgets')
 def get_budgets():
     user_id = get_jwt_identity()
-    budgets = Budget.query.filter_by(user_id=user_id).all()
-    return jsonify([budget.serialize() for budget in budgets]), 200
+    query = Budget.query.filter_by(user_id=user_id)
+    return paginate(query, (Budget.date, Budget.id))
+
+@api.route('/budgets', methods=['PATCH'])
+@jwt_required()
+def bulk_update_budgets():
+    return bulk_update_view('budgets')
+
+@api.route('/budgets', methods=['DELETE'])
+@jwt_required()
+def bulk_delete_budgets():
+    return bulk_delete_view('budgets')
 
 @api.route('/budgets/<int:budget_id>', methods=['PUT'])
 @jwt_required()
 def update_budget(budget_id):
     user_id = get_jwt_identity()
-    budget = Budget.query.get(budget_id)
-    if not budget or int(budget.user_id) != int(user_id):
-        raise APIException("Presupuesto no encontrado o no autorizado", status_code=403)
-
     data = request.json
-    budget.amount = data.get("amount", budget.amount)
-    budget.status = data.get("status", budget.status)
-    budget.description = data.get("description", budget.description)
+    changes = {field: data[field] for field in ("amount", "status", "description") if field in data}
 
+    row, _ = owned_update(Budget, budget_id, user_id, changes)
+    if row is None:
+        raise APIException("Presupuesto no encontrado o no autorizado", status_code=403)
+
+    DataVersion.bump(user_id, 'budgets')
     db.session.commit()
-    return jsonify(budget.serialize()), 200
+    return jsonify(serialize_row(Budget, row)), 200
 
 @api.route('/budgets/<int:budget_id>', methods=['DELETE'])
 @jwt_required()
 def delete_budget(budget_id):
     user_id = get_jwt_identity()
-    budget = Budget.query.get(budget_id)
-    if not budget or int(budget.user_id) != int(user_id):
+    if owned_delete(Budget, budget_id, user_id) is None:
         raise APIException("Presupuesto no encontrado o no autorizado", status_code=403)
 
-    db.session.delete(budget)
+    DataVersion.bump(user_id, 'budgets')
     db.session.commit()
     return jsonify({"message": f"Presupuesto con ID {budget_id} eliminado correctamente"}), 200
 
-@api.route('/chart', methods=['GET'])
+@api.route('/payments', methods=['POST'])
 @jwt_required()
-def generate_chart():
+def create_payment():
     user_id = get_jwt_identity()
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    
-    query = Transaction.query.filter_by(user_id=user_id)
+    data = request.json
+    if not all([data.get(field) for field in ["amount", "recipient", "status"]]):
+        raise APIException("Faltan campos obligatorios (amount, recipient, status)", status_code=400)
+    if data['status'] not in PAYMENT_STATUSES:
+        raise APIException(f"Estado inválido. Debe ser uno de: {', '.join(PAYMENT_STATUSES)}", status_code=400)
 
-    if start_date:
-        try:
-            start_date_parsed = datetime.strptime(start_date, "%Y-%m-%d")
-            query = query.filter(Transaction.date >= start_date_parsed)
-        except ValueError:
-            raise APIException("Formato de fecha inválido para start_date. Debe ser 'YYYY-MM-DD'", status_code=400)
+    payment_date = datetime.utcnow()
+    if data.get('date'):
+        payment_date = parse_date(data['date'])
 
-    if end_date:
-        try:
-            end_date_parsed = datetime.strptime(end_date, "%Y-%m-%d")
-            query = query.filter(Transaction.date <= end_date_parsed)
-        except ValueError:
-            raise APIException("Formato de fecha inválido para end_date. Debe ser 'YYYY-MM-DD'", status_code=400)
+    payment = Payment(
+        user_id=user_id,
+        amount=data['amount'],
+        recipient=data['recipient'],
+        status=data['status'],
+        date=payment_date
+    )
+    db.session.add(payment)
+    DataVersion.bump(user_id, 'payments')
+    db.session.commit()
+    return jsonify(payment.serialize()), 201
 
-    transactions = query.all()
+@api.route('/payments', methods=['GET'])
+@jwt_required()
+@versioned('payments')
+def get_payments():
+    user_id = get_jwt_identity()
+    query = Payment.query.filter_by(user_id=user_id)
+    status = request.args.get('status')
+    if status:
+        if status not in PAYMENT_STATUSES:
+            raise APIException(f"Estado inválido. Debe ser uno de: {', '.join(PAYMENT_STATUSES)}", status_code=400)
+        query = query.filter_by(status=status)
+    return paginate(query, (Payment.date, Payment.id))
+
+@api.route('/payments/<int:payment_id>', methods=['PUT'])
+@jwt_required()
+def update_payment(payment_id):
+    user_id = get_jwt_identity()
+    data = request.json
+    changes = {field: data[field] for field in ("amount", "recipient", "status") if field in data}
+    if "status" in changes and changes["status"] not in PAYMENT_STATUSES:
+        raise APIException(f"Estado inválido. Debe ser uno de: {', '.join(PAYMENT_STATUSES)}", status_code=400)
+    if "date" in data:
+        changes["date"] = parse_date(data["date"])
 
-    if not transactions:
-        raise APIException("No se encontraron transacciones en el rango de fechas proporcionado", status_code=404)
+    row, _ = owned_update(Payment, payment_id, user_id, changes)
+    if row is None:
+        raise APIException("Pago no encontrado o no autorizado", status_code=403)
+
+    DataVersion.bump(user_id, 'payments')
+    db.session.commit()
+    return jsonify(serialize_row(Payment, row)), 200
+
+@api.route('/payments/<int:payment_id>', methods=['DELETE'])
+@jwt_required()
+def delete_payment(payment_id):
+    user_id = get_jwt_identity()
+    if owned_delete(Payment, payment_id, user_id) is None:
+        raise APIException("Pago no encontrado o no autorizado", status_code=403)
+
+    DataVersion.bump(user_id, 'payments')
+    db.session.commit()
+    return jsonify({"message": f"Pago con ID {payment_id} eliminado correctamente"}), 200
+
+@api.route('/payments/settle', methods=['POST'])
+@jwt_required()
+def settle():
+    user_id = get_jwt_identity()
+    if not request.is_json or not isinstance(request.json, dict):
+        raise APIException("Se esperaba un objeto JSON con el filtro de pagos a liquidar", status_code=400)
+
+    conditions = parse_settle_filters(request.json, current_app.config.get('BULK_MAX_IDS', 10000))
+    return jsonify(settle_payments(user_id, conditions)), 200
+
+@api.route('/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    user_id = get_jwt_identity()
+    if not request.is_json:
+        raise APIException("El tipo de contenido debe ser JSON", status_code=415)
+
+    operations = request.json.get("operations") if isinstance(request.json, dict) else request.json
+    results = run_batch(operations, user_id, current_app.config.get('BATCH_MAX_OPERATIONS', 500))
+    return jsonify({"results": results}), 200
+
+@api.route('/export/<resource>', methods=['GET'])
+@jwt_required()
+def export_resource(resource):
+    user_id = get_jwt_identity()
+    fmt, start_date_parsed, end_date_parsed, gzip = parse_export_args(resource, request.args)
+    stream = export_stream(resource, fmt, user_id, start_date_parsed, end_date_parsed, gzip)
+    return Response(
+        stream_with_context(stream),
+        mimetype=export_mimetype(fmt, gzip),
+        headers={"Content-Disposition": f"attachment; filename={export_filename(resource, fmt, gzip)}"},
+    )
+
+@api.route('/summary', methods=['GET'])
+@jwt_required()
+# Sin end_date los proyectos activos se cuentan a fecha de hoy: el ETag cambia cada día
+@versioned('transactions', 'employees', 'projects', 'budgets',
+           vary=lambda: "" if request.args.get('end_date') else datetime.utcnow().date().isoformat())
+def get_summary():
+    user_id = get_jwt_identity()
+    start_date_parsed, end_date_parsed = parse_date_range(request.args)
+    if start_date_parsed and end_date_parsed and start_date_parsed > end_date_parsed:
+        raise APIException("start_date no puede ser posterior a end_date", status_code=400)
 
-    chart_data = Transaction.transform_for_chart(transactions)
+    return jsonify(build_summary(user_id, start_date_parsed, end_date_parsed)), 200
 
+@api.route('/analytics', methods=['GET'])
+@jwt_required()
+@versioned('transactions')
+def get_analytics():
+    user_id = get_jwt_identity()
+    start_date_parsed, end_date_parsed = parse_date_range(request.args)
+    try:
+        threshold = float(request.args.get('threshold', 3.5))
+    except ValueError:
+        raise APIException("El parámetro threshold debe ser un número", status_code=400)
+    if threshold <= 0:
+        raise APIException("El parámetro threshold debe ser mayor que 0", status_code=400)
+
+    status = request.args.get('status')
+    if status and status not in STATUS_CODES:
+        raise APIException(f"Estado inválido. Debe ser uno de: {', '.join(STATUS_CODES)}", status_code=400)
+
+    columns = get_columns(user_id, start_date_parsed, end_date_parsed)
+    if status:
+        columns = columns.filter(columns.statuses == STATUS_CODES[status])
+    if not len(columns):
+        raise APIException("No se encontraron transacciones en el rango de fechas proporcionado", status_code=404)
     try:
-        response = requests.post("https://quickchart.io/chart/create", json=chart_data)
-        response.raise_for_status()
-        return jsonify(response.json()), 200
-    except requests.RequestException as e:
-        raise APIException(f"Error al generar el gráfico: {str(e)}", status_code=500)
+        return jsonify(analyze(columns, threshold, parse_limit() or 50)), 200
+    except ValueError as e:
+        raise APIException(str(e), status_code=400)
+
+@api.route('/search', methods=['GET'])
+@jwt_required()
+@versioned('transactions', 'employees', 'projects')
+def search_records():
+    user_id = get_jwt_identity()
+    kinds = request.args.get('type')
+    result = search(user_id, request.args.get('q'), kinds.split(",") if kinds else None,
+                    parse_limit() or DEFAULT_SEARCH_LIMIT, request.args.get('cursor'))
+    return jsonify(result), 200
+
+@api.route('/chart', methods=['GET'])
+@jwt_required()
+def generate_chart():
+    user_id = get_jwt_identity()
+    start_date_parsed, end_date_parsed, granularity = parse_chart_args(request.args)
+    return jsonify(build_chart(user_id, start_date_parsed, end_date_parsed, granularity)), 200
+
+def job_accepted(job):
+    """202 con el id del trabajo y la URL donde consultar su estado."""
+    status_url = url_for('api.get_job', job_id=job.id)
+    response = jsonify({"job_id": job.id, "status": job.status, "status_url": status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+@api.route('/jobs/chart', methods=['POST'])
+@jwt_required()
+def enqueue_chart():
+    user_id = get_jwt_identity()
+    args = request.get_json(silent=True) or request.args
+    granularity = parse_chart_args(args)[2]  # Validar ya: el worker vuelve a interpretar los mismos argumentos
+    payload = {"start_date": args.get('start_date'), "end_date": args.get('end_date'), "granularity": granularity}
+    return job_accepted(enqueue(user_id, "chart", payload))
+
+@api.route('/jobs/export/<resource>', methods=['POST'])
+@jwt_required()
+def enqueue_export(resource):
+    user_id = get_jwt_identity()
+    args = request.get_json(silent=True) or request.args
+    fmt, start_date_parsed, end_date_parsed, gzip = parse_export_args(resource, args)
+    payload = {
+        "resource": resource,
+        "format": fmt,
+        "gzip": gzip,
+        "start_date": start_date_parsed.isoformat() if start_date_parsed else None,
+        "end_date": end_date_parsed.isoformat() if end_date_parsed else None,
+    }
+    return job_accepted(enqueue(user_id, "export", payload))
+
+@api.route('/jobs/import', methods=['POST'])
+@jwt_required()
+def enqueue_import():
+    user_id = get_jwt_identity()
+    _, batch_size = parse_import_args()
+    payload = {"mimetype": request.mimetype, "batch_size": batch_size}
+    return job_accepted(enqueue(user_id, "import", payload, upload=request.stream))
+
+@api.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    user_id = get_jwt_identity()
+    job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        raise APIException("Trabajo no encontrado", status_code=404)
+
+    data = job.serialize()
+    if job.kind == "export" and job.status == "succeeded":
+        data["download_url"] = url_for('api.download_job_result', job_id=job.id)
+    response = jsonify(data)
+    if job.status in ("queued", "running"):
+        response.headers['Retry-After'] = '1'
+    return response, 200
+
+@api.route('/jobs/<int:job_id>/download', methods=['GET'])
+@jwt_required()
+def download_job_result(job_id):
+    user_id = get_jwt_identity()
+    job = Job.query.filter_by(id=job_id, user_id=user_id, kind="export").first()
+    if not job:
+        raise APIException("Trabajo no encontrado", status_code=404)
+    if job.status != "succeeded":
+        raise APIException("La exportación todavía no está disponible", status_code=409, payload={"status": job.status})
+    if not job_file_exists(job.id, "result"):
+        raise APIException("El fichero de la exportación ya no está disponible", status_code=410)
+    return Response(stream_with_context(iter_job_file(job.id, "result")), mimetype=job.result["mimetype"],
+                    headers={"Content-Disposition": f"attachment; filename={job.result['filename']}",
+                             "Content-Length": str(job.result["size"])})
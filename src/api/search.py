@@ -0,0 +1,153 @@
+"""
+Búsqueda de texto en transacciones (description/company), proyectos (name/client) y empleados
+(name/position) del usuario, con índices de texto reales:
+
+- Postgres: índices GIN sobre to_tsvector('simple', ...) para palabras y prefijos, y GIN trigram
+  (pg_trgm) para subcadenas; ambos compuestos con user_id (btree_gin) para no recorrer otras cuentas.
+  Las expresiones de las consultas son exactamente las de los índices.
+- SQLite: tablas FTS5 de contenido externo (<tabla>_fts) mantenidas por triggers.
+
+Los resultados de las tres tablas se ordenan juntos por relevancia. La paginación es por desplazamiento
+(codificado en el cursor): para ordenar por relevancia hay que puntuar todas las coincidencias igualmente.
+"""
+import re
+import json
+import base64
+from sqlalchemy import DDL, event, select, union_all, literal, literal_column, func, or_, table, column
+from api.models import db, Transaction, Project, Employee
+from api.utils import APIException
+
+# tipo de resultado: (modelo, columna del título, columna del detalle)
+SEARCH_ENTITIES = {
+    "transactions": (Transaction, "description", "company"),
+    "projects": (Project, "name", "client"),
+    "employees": (Employee, "name", "position"),
+}
+MAX_QUERY_LENGTH = 200
+MAX_QUERY_TERMS = 10
+DEFAULT_LIMIT = 20
+
+
+def document_sql(title, detail):
+    """Texto indexado de una fila; tiene que coincidir carácter a carácter con el de los índices de Postgres."""
+    return f"coalesce({title}, '') || ' ' || coalesce({detail}, '')"
+
+
+def postgresql_ddl(tablename, title, detail):
+    document = document_sql(title, detail)
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        f"CREATE INDEX IF NOT EXISTS ix_{tablename}_search ON {tablename} "
+        f"USING gin (user_id, to_tsvector('simple', {document}))",
+        f"CREATE INDEX IF NOT EXISTS ix_{tablename}_search_trgm ON {tablename} "
+        f"USING gin (user_id, ({document}) gin_trgm_ops)",
+    ]
+
+
+def sqlite_ddl(tablename, title, detail):
+    fts = f"{tablename}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({title}, {detail}, content='{tablename}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} BEGIN "
+        f"INSERT INTO {fts}(rowid, {title}, {detail}) VALUES (new.id, new.{title}, new.{detail}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {title}, {detail}) VALUES ('delete', old.id, old.{title}, old.{detail}); END",
+        # Solo cuando cambia el texto: los cambios masivos de estado no reescriben el índice
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {title}, {detail} ON {tablename} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {title}, {detail}) VALUES ('delete', old.id, old.{title}, old.{detail}); "
+        f"INSERT INTO {fts}(rowid, {title}, {detail}) VALUES (new.id, new.{title}, new.{detail}); END",
+    ]
+
+
+# db.create_all() (tests, smoke, desarrollo sin migraciones) crea los mismos índices que la migración
+for _model, _title, _detail in SEARCH_ENTITIES.values():
+    _table = _model.__table__
+    for _statement in postgresql_ddl(_table.name, _title, _detail):
+        event.listen(_table, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+    for _statement in sqlite_ddl(_table.name, _title, _detail):
+        event.listen(_table, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+def query_terms(q):
+    """Palabras de la búsqueda (letras y dígitos), para construir consultas de prefijo sin sintaxis del usuario."""
+    return re.findall(r"\w+", q.lower())[:MAX_QUERY_TERMS]
+
+
+def _postgresql_select(kind, model, title, detail, user_id, q, terms):
+    document = literal_column(f"({document_sql(title, detail)})")
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    match = document.ilike(pattern, escape="\\")
+    rank = func.similarity(document, q)
+    if terms:
+        vector = literal_column(f"to_tsvector('simple', {document_sql(title, detail)})")
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        match = or_(vector.op("@@")(tsquery), match)
+        rank = func.ts_rank(vector, tsquery) + rank
+    return (
+        select(literal(kind).label("type"), model.id, getattr(model, title).label("title"),
+               getattr(model, detail).label("detail"), rank.label("rank"))
+        .where(model.user_id == int(user_id), match)
+    )
+
+
+def _sqlite_select(kind, model, title, detail, user_id, terms):
+    fts_name = f"{model.__tablename__}_fts"
+    fts = table(fts_name, column("rowid"))
+    match = " ".join(f'"{term}"*' for term in terms)  # Todas las palabras, como prefijo
+    return (
+        select(literal(kind).label("type"), model.id, getattr(model, title).label("title"),
+               getattr(model, detail).label("detail"), (-func.bm25(literal_column(fts_name))).label("rank"))
+        .select_from(fts.join(model.__table__, model.id == fts.c.rowid))
+        .where(model.user_id == int(user_id), literal_column(fts_name).op("MATCH")(match))
+    )
+
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor):
+    try:
+        offset, = json.loads(base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()))
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError
+        return offset
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise APIException("Cursor inválido", status_code=400)
+
+
+def search(user_id, q, kinds=None, limit=DEFAULT_LIMIT, cursor=None):
+    """Resultados de `q` ordenados por relevancia. Devuelve {"items": [...], "next_cursor": ...}."""
+    q = (q or "").strip()
+    if not q:
+        raise APIException("El parámetro q es obligatorio", status_code=400)
+    if len(q) > MAX_QUERY_LENGTH:
+        raise APIException(f"La búsqueda no puede superar {MAX_QUERY_LENGTH} caracteres", status_code=400)
+    kinds = kinds or list(SEARCH_ENTITIES)
+    unknown = [kind for kind in kinds if kind not in SEARCH_ENTITIES]
+    if unknown:
+        raise APIException(f"Tipo inválido. Debe ser uno de: {', '.join(SEARCH_ENTITIES)}", status_code=400)
+    offset = decode_offset(cursor) if cursor else 0
+
+    terms = query_terms(q)
+    dialect = db.session.get_bind().dialect.name
+    selects = []
+    for kind in kinds:
+        model, title, detail = SEARCH_ENTITIES[kind]
+        if dialect == "postgresql":
+            selects.append(_postgresql_select(kind, model, title, detail, user_id, q, terms))
+        elif terms:
+            selects.append(_sqlite_select(kind, model, title, detail, user_id, terms))
+    if not selects:  # Sin palabras buscables FTS5 no puede coincidir con nada
+        return {"items": [], "next_cursor": None}
+
+    results = union_all(*selects).subquery()
+    rows = db.session.execute(
+        select(results).order_by(results.c.rank.desc(), results.c.type, results.c.id).limit(limit + 1).offset(offset)
+    ).all()
+    next_cursor = encode_offset(offset + limit) if len(rows) > limit else None
+    items = [{"type": row.type, "id": row.id, "title": row.title, "detail": row.detail, "rank": float(row.rank)}
+             for row in rows[:limit]]
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,127 @@
+"""
+Generador de datos sintéticos realistas para desarrollo y benchmarks: usuarios con años de transacciones,
+empleados, proyectos, presupuestos y pagos, insertados por lotes con executemany.
+"""
+import random
+from datetime import datetime, timedelta
+from api.models import db, User, Transaction, TransactionRollup, Payment, Employee, Project, Budget
+from api.passwords import hash_password
+
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka", "Tyrell", "Cyberdyne"]
+INDUSTRIES = ["Tecnología", "Construcción", "Retail", "Consultoría", "Salud", "Logística"]
+POSITIONS = ["Desarrollador", "Diseñadora", "Contable", "Jefe de proyecto", "Comercial", "Soporte"]
+INCOME_CONCEPTS = ["Factura cliente", "Venta de servicios", "Licencias", "Mantenimiento", "Consultoría"]
+EXPENSE_CONCEPTS = ["Nóminas", "Alquiler", "Proveedores", "Suministros", "Software", "Viajes", "Impuestos"]
+NAMES = ["Ana", "Luis", "María", "Jorge", "Lucía", "Pablo", "Elena", "Carlos", "Sara", "Diego", "Marta", "Iván"]
+SURNAMES = ["García", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Ruiz", "Díaz", "Moreno", "Álvarez"]
+
+
+class BatchInserter:
+    """Acumula filas por tabla y las inserta con executemany cada `batch_size` filas."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.pending = {}
+        self.inserted = {}
+
+    def add(self, model, row):
+        rows = self.pending.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        for current in ([model] if model else list(self.pending)):
+            rows = self.pending.pop(current, [])
+            if rows:
+                db.session.execute(db.insert(current.__table__), rows)
+                self.inserted[current.__tablename__] = self.inserted.get(current.__tablename__, 0) + len(rows)
+
+
+def seed(users=5, years=2, transactions_per_month=200, employees=15, projects=8, budgets_per_project=4,
+         payments_per_month=30, password="123456", batch_size=5000, random_seed=42, log=print):
+    """Genera los datos y devuelve cuántas filas se insertaron por tabla."""
+    rng = random.Random(random_seed)
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=365 * years)
+    span = int((end - start).total_seconds())
+    months = years * 12
+    password_hash = hash_password(password)  # Mismo hash para todos: calcularlo una sola vez
+
+    first_index = (db.session.execute(db.select(db.func.max(User.id))).scalar() or 0) + 1
+    user_rows = [{
+        "name": f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}",
+        "company": f"{rng.choice(COMPANIES)} {first_index + i}",
+        "industry": rng.choice(INDUSTRIES),
+        "email": f"seed_user{first_index + i}@example.com",
+        "password_hash": password_hash,
+        "created_at": start,
+    } for i in range(users)]
+    user_ids = [row.id for row in db.session.execute(db.insert(User.__table__).returning(User.__table__.c.id), user_rows)]
+    log(f"{len(user_ids)} usuarios creados (contraseña: {password})")
+
+    inserter = BatchInserter(batch_size)
+    for user_id in user_ids:
+        def random_date():
+            return start + timedelta(seconds=rng.randrange(span))
+
+        for _ in range(transactions_per_month * months):
+            income = rng.random() < 0.45
+            inserter.add(Transaction, {
+                "user_id": user_id,
+                "amount": round(rng.lognormvariate(7 if income else 6, 1), 2),
+                "description": rng.choice(INCOME_CONCEPTS if income else EXPENSE_CONCEPTS),
+                "transaction_type": "income" if income else "expense",
+                "status": "completed" if rng.random() < 0.85 else "pending",
+                "company": rng.choice(COMPANIES),
+                "date": random_date(),
+            })
+        for _ in range(payments_per_month * months):
+            inserter.add(Payment, {
+                "user_id": user_id,
+                "amount": round(rng.lognormvariate(6, 0.8), 2),
+                "recipient": f"{rng.choice(COMPANIES)} S.L.",
+                "status": "paid" if rng.random() < 0.8 else "pending",
+                "date": random_date(),
+            })
+        for _ in range(employees):
+            inserter.add(Employee, {
+                "user_id": user_id,
+                "name": f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}",
+                "salary": float(rng.randrange(1200, 6000, 50)),
+                "position": rng.choice(POSITIONS),
+            })
+
+        # Los presupuestos necesitan el id del proyecto: los proyectos se insertan con RETURNING
+        project_rows = []
+        for number in range(projects):
+            project_start = random_date()
+            project_rows.append({
+                "user_id": user_id,
+                "name": f"Proyecto {number + 1}",
+                "description": f"Proyecto para {rng.choice(COMPANIES)}",
+                "client": rng.choice(COMPANIES),
+                "start_date": project_start,
+                "end_date": project_start + timedelta(days=rng.randrange(30, 365)) if rng.random() < 0.6 else None,
+            })
+        if project_rows:
+            project_ids = [row.id for row in db.session.execute(
+                db.insert(Project.__table__).returning(Project.__table__.c.id), project_rows)]
+            inserter.inserted["projects"] = inserter.inserted.get("projects", 0) + len(project_ids)
+            for project_id in project_ids:
+                for _ in range(budgets_per_project):
+                    inserter.add(Budget, {
+                        "user_id": user_id,
+                        "project_id": project_id,
+                        "description": "Presupuesto " + rng.choice(["inicial", "ampliación", "mantenimiento"]),
+                        "amount": round(rng.lognormvariate(8, 0.7), 2),
+                        "status": rng.choice(["pending", "approved", "rejected"]),
+                        "date": random_date(),
+                    })
+        inserter.flush()
+        db.session.commit()
+        log(f"Usuario {user_id}: {inserter.inserted}")
+
+    TransactionRollup.rebuild()
+    db.session.commit()
+    return {"users": len(user_ids), **inserter.inserted}
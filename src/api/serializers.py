@@ -0,0 +1,68 @@
+"""
+Serialización rápida para listados: selecciona solo las columnas que devuelve `serialize()` como tuplas,
+sin construir instancias del ORM, y las convierte a dicts en bloque. La salida JSON es idéntica
+byte a byte a la de jsonify([obj.serialize() ...]).
+"""
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import Numeric
+from api.models import User, Transaction, Payment, Employee, Project, Budget
+
+# Columnas de cada modelo en el mismo orden que su serialize()
+SERIALIZED_COLUMNS = {
+    User: ("id", "name", "company", "industry", "email", "created_at"),
+    Transaction: ("id", "user_id", "amount", "description", "transaction_type", "status", "company", "date"),
+    Payment: ("id", "user_id", "amount", "recipient", "status", "date"),
+    Employee: ("id", "user_id", "name", "salary", "position"),
+    Project: ("id", "user_id", "name", "description", "client", "start_date", "end_date"),
+    Budget: ("id", "user_id", "project_id", "description", "amount", "status", "date"),
+}
+
+# Mismos parámetros que el proveedor JSON por defecto de Flask en modo compacto
+_encoder = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(",", ":"))
+
+
+def projected_columns(model):
+    return [getattr(model, column) for column in SERIALIZED_COLUMNS[model]]
+
+
+def serialize_rows(model, rows):
+    """
+    Convierte filas (tuplas) de projected_columns(model) en los dicts de serialize(). Los importes se
+    convierten al tipo de la columna: en SQLite las filas de RETURNING o de objetos aún sin recargar
+    traen el valor enviado tal cual (99 en vez de 99.0).
+    """
+    names = SERIALIZED_COLUMNS[model]
+    types = [getattr(model, name).type for name in names]
+    dates = [i for i, column_type in enumerate(types) if column_type.python_type is datetime]
+    numbers = [(i, column_type.python_type) for i, column_type in enumerate(types) if isinstance(column_type, Numeric)]
+    if not dates and not numbers:
+        return [dict(zip(names, row)) for row in rows]
+
+    items = []
+    for row in rows:
+        row = list(row)
+        for i in dates:
+            if row[i] is not None:
+                row[i] = row[i].isoformat()
+        for i, python_type in numbers:
+            if row[i] is not None:
+                row[i] = python_type(row[i])
+        items.append(dict(zip(names, row)))
+    return items
+
+
+def serialize_instance(obj):
+    """serialize() de una instancia del ORM con las mismas conversiones que serialize_rows."""
+    model = type(obj)
+    return serialize_rows(model, [[getattr(obj, name) for name in SERIALIZED_COLUMNS[model]]])[0]
+
+
+def json_response(payload):
+    """Equivalente a jsonify(payload) reutilizando un único codificador."""
+    provider = current_app.json
+    if provider.compact is False or (provider.compact is None and current_app.debug) \
+            or not provider.sort_keys or not provider.ensure_ascii:
+        return provider.response(payload)
+    return current_app.response_class(_encoder.encode(payload) + "\n", mimetype=provider.mimetype)
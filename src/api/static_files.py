@@ -0,0 +1,130 @@
+"""
+Servidor de los ficheros del front (public/) a partir de un índice construido al arrancar:
+ETag a partir del hash del contenido, caché inmutable de un año para los ficheros con hash en el
+nombre, variantes precomprimidas .br/.gz según Accept-Encoding e index.html siempre revalidado.
+"""
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+from flask import current_app, request, send_file
+
+# bundle.3f9a1c0e5b7d2a4c6e8f.js, main.3f9a1c0e.css... (contenthash de webpack)
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[^./]+$")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml",
+                      "image/x-icon", "image/vnd.microsoft.icon")
+MIN_COMPRESS_BYTES = 1024
+INDEX_FILE = "index.html"
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StaticAsset:
+    __slots__ = ("path", "mimetype", "etag", "immutable", "variants", "mtime")
+
+    def __init__(self, path, name):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        self.mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.etag = _file_hash(path)
+        self.immutable = bool(HASHED_NAME.search(name))
+        # Solo variantes al menos tan recientes como el original: una .gz antigua serviría contenido viejo
+        self.variants = {
+            encoding: path + suffix for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix) and os.stat(path + suffix).st_mtime >= self.mtime
+        }
+
+
+class StaticIndex:
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        self.refresh()
+
+    def refresh(self):
+        assets = {}
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                previous = self.assets.get(name)
+                if previous and previous.mtime == os.stat(path).st_mtime:
+                    assets[name] = previous
+                else:
+                    assets[name] = StaticAsset(path, name)
+        self.assets = assets
+
+    def serve(self, name):
+        """Respuesta para `name`; las rutas que no son ficheros devuelven index.html (rutas de la SPA)."""
+        if current_app.debug:
+            self.refresh()  # En desarrollo webpack reescribe public/ continuamente
+        asset = self.assets.get(name) or self.assets.get(INDEX_FILE)
+        if asset is None:
+            return current_app.response_class("No se encontró index.html; ejecuta npm run build", status=404)
+
+        path, encoding = asset.path, None
+        for candidate in asset.variants:
+            if request.accept_encodings[candidate]:
+                path, encoding = asset.variants[candidate], candidate
+                break
+
+        etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+        response = send_file(path, mimetype=asset.mimetype, etag=etag, conditional=True)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+
+        if name == INDEX_FILE or asset is not self.assets.get(name):
+            response.cache_control.no_cache = True
+            return response
+        response.cache_control.no_cache = None  # send_file lo añade si no recibe max_age
+        response.cache_control.public = True
+        if asset.immutable:
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = current_app.config['STATIC_MAX_AGE']
+        return response
+
+
+def precompress(root, log=print):
+    """Genera las variantes .gz (y .br si está instalado brotli) de los ficheros comprimibles de `root`."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        log("brotli no está instalado: solo se generan variantes .gz")
+
+    written = 0
+    for name, asset in StaticIndex(root).assets.items():
+        if not asset.mimetype.startswith(COMPRESSIBLE_TYPES) or os.path.getsize(asset.path) < MIN_COMPRESS_BYTES:
+            continue
+        with open(asset.path, "rb") as f:
+            data = f.read()
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                with open(asset.path + suffix, "wb") as f:
+                    f.write(compressed)
+                written += 1
+        log(f"{name}: {len(data)} B -> " + ", ".join(f"{s} {len(c)} B" for s, c in variants.items()))
+    return written
+
+
+def setup_static_files(app, root):
+    app.config.setdefault('STATIC_MAX_AGE', int(os.getenv("STATIC_MAX_AGE", 3600)))
+    app.extensions["static_files"] = StaticIndex(root)
+    return app.extensions["static_files"]
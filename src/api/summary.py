@@ -0,0 +1,109 @@
+"""
+Resumen del panel de inicio en una sola llamada: totales de transacciones, nóminas, presupuestos
+y proyectos calculados con unas pocas consultas agregadas en lugar de descargar todas las filas.
+"""
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func, or_
+from api.models import db, Transaction, TransactionRollup, Employee, Project, Budget, truncate_date
+from api.analytics import TYPE_CODES, STATUS_CODES, OTHER_CODE
+from api.transaction_cache import cached_columns
+
+
+def _money(value):
+    return round(value or 0.0, 2)
+
+
+def _grouped_rows(columns):
+    """Mismas filas (tipo, estado, importe, número) que el GROUP BY, a partir de las columnas en caché."""
+    width = OTHER_CODE + 1
+    keys = columns.types.astype(np.int64) * width + columns.statuses
+    amounts = np.bincount(keys, weights=columns.amounts, minlength=width * width)
+    counts = np.bincount(keys, minlength=width * width)
+    return [(transaction_type, status, float(amounts[type_code * width + status_code]),
+             int(counts[type_code * width + status_code]))
+            for transaction_type, type_code in TYPE_CODES.items() for status, status_code in STATUS_CODES.items()]
+
+
+def transaction_totals(user_id, start=None, end=None):
+    """Suma de importes y número de transacciones por tipo y estado."""
+    # Sin fecha de fin y con inicio en día 1 el rango cubre meses enteros: bastan los totales mensuales
+    if not end and (not start or start.day == 1):
+        query = db.session.query(
+            TransactionRollup.transaction_type, TransactionRollup.status,
+            func.sum(TransactionRollup.amount), func.sum(TransactionRollup.count),
+        ).filter(TransactionRollup.user_id == int(user_id))
+        if start:
+            query = query.filter(TransactionRollup.period >= truncate_date(start, "month"))
+        rows = query.group_by(TransactionRollup.transaction_type, TransactionRollup.status).all()
+    elif (columns := cached_columns(user_id)) is not None and not (columns.statuses == OTHER_CODE).any():
+        rows = _grouped_rows(columns.between(start, end))
+    else:
+        query = db.session.query(
+            Transaction.transaction_type, Transaction.status, func.sum(Transaction.amount), func.count(),
+        ).filter(Transaction.user_id == user_id)
+        if start:
+            query = query.filter(Transaction.date >= start)
+        if end:
+            query = query.filter(Transaction.date <= end)
+        rows = query.group_by(Transaction.transaction_type, Transaction.status).all()
+
+    totals = {"income": 0.0, "expense": 0.0, "count": 0, "by_status": {}}
+    for transaction_type, status, amount, count in rows:
+        if not count or transaction_type not in ("income", "expense"):
+            continue
+        by_status = totals["by_status"].setdefault(status, {"income": 0.0, "expense": 0.0, "count": 0})
+        by_status[transaction_type] += amount or 0.0
+        by_status["count"] += count
+        totals[transaction_type] += amount or 0.0
+        totals["count"] += count
+
+    for group in [totals, *totals["by_status"].values()]:
+        group["profit"] = _money(group["income"] - group["expense"])
+        group["income"], group["expense"] = _money(group["income"]), _money(group["expense"])
+    return totals
+
+
+def payroll_totals(user_id):
+    total, count = db.session.query(func.sum(Employee.salary), func.count()).filter(Employee.user_id == user_id).one()
+    return {"monthly_total": _money(total), "employees": count}
+
+
+def budget_totals(user_id, start=None, end=None):
+    query = db.session.query(Budget.status, func.sum(Budget.amount), func.count()).filter(Budget.user_id == user_id)
+    if start:
+        query = query.filter(Budget.date >= start)
+    if end:
+        query = query.filter(Budget.date <= end)
+    by_status = {status: {"amount": _money(amount), "count": count}
+                 for status, amount, count in query.group_by(Budget.status).all()}
+    return {
+        "total": _money(sum(group["amount"] for group in by_status.values())),
+        "count": sum(group["count"] for group in by_status.values()),
+        "by_status": by_status,
+    }
+
+
+def project_totals(user_id, start=None, end=None):
+    """Proyectos totales y activos: los que se solapan con el rango (o siguen abiertos hoy si no hay rango)."""
+    period_end = end or datetime.utcnow()
+    period_start = start or period_end
+    active = db.and_(
+        or_(Project.start_date.is_(None), Project.start_date <= period_end),
+        or_(Project.end_date.is_(None), Project.end_date >= period_start),
+    )
+    total, active_count = db.session.query(
+        func.count(), func.coalesce(func.sum(db.case((active, 1), else_=0)), 0),
+    ).filter(Project.user_id == user_id).one()
+    return {"total": total, "active": active_count}
+
+
+def build_summary(user_id, start=None, end=None):
+    return {
+        "start_date": start.strftime("%Y-%m-%d") if start else None,
+        "end_date": end.strftime("%Y-%m-%d") if end else None,
+        "transactions": transaction_totals(user_id, start, end),
+        "payroll": payroll_totals(user_id),
+        "budgets": budget_totals(user_id, start, end),
+        "projects": project_totals(user_id, start, end),
+    }
@@ -0,0 +1,133 @@
+"""
+Caché por proceso de las transacciones de cada usuario en formato columnar (TransactionColumns),
+con presupuesto de memoria (TRANSACTION_CACHE_MB) y expulsión LRU.
+
+La versión de datos del usuario (DataVersion 'transactions') hace de señal de invalidación entre
+workers: toda escritura la incrementa en su misma transacción y una entrada solo se sirve si su
+versión coincide con la actual. Las escrituras de este worker parchean la entrada tras el commit
+en lugar de obligar a recargarla.
+"""
+import os
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from api.models import db, DataVersion
+from api.db_routing import RoutingSession
+from api.analytics import load_columns, row_for
+from api.metrics import TRANSACTION_CACHE
+
+PATCHES_KEY = "transaction_cache_patches"
+
+
+class TransactionCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # user_id -> (versión, columnas)
+        self._lock = threading.Lock()
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, version, columns):
+        with self._lock:
+            self._discard(user_id)
+            self._store(user_id, version, columns)
+
+    def patch(self, user_id, version, apply):
+        """Aplica `apply` si la entrada está justo en la versión anterior; si no, la descarta."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            self._discard(user_id)
+            if entry[0] == version - 1:
+                self._store(user_id, version, apply(entry[1]))
+
+    def discard(self, user_id):
+        with self._lock:
+            self._discard(user_id)
+
+    def _store(self, user_id, version, columns):
+        if columns.nbytes > self.max_bytes:
+            return
+        self._entries[user_id] = (version, columns)
+        self.size += columns.nbytes
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted.nbytes
+
+    def _discard(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.size -= entry[1].nbytes
+
+
+def _cache():
+    return current_app.extensions.get("transaction_cache")
+
+
+def cached_columns(user_id):
+    """Columnas de todas las transacciones del usuario desde la caché, o None si está desactivada."""
+    cache = _cache()
+    if cache is None:
+        return None
+    user_id = int(user_id)
+    version = DataVersion.current(user_id, "transactions")
+    columns = cache.get(user_id, version)
+    if columns is not None:
+        TRANSACTION_CACHE.inc("hit")
+        return columns
+    TRANSACTION_CACHE.inc("miss")
+    columns = load_columns(user_id)
+    cache.put(user_id, version, columns)
+    return columns
+
+
+def get_columns(user_id, start=None, end=None):
+    columns = cached_columns(user_id)
+    if columns is None:
+        return load_columns(user_id, start, end)
+    return columns.between(start, end)
+
+
+def stage_patch(user_id, upsert=None, delete_id=None):
+    """
+    Registra el cambio de una escritura de transacciones para aplicarlo a la caché cuando se haga commit.
+    Debe llamarse después de DataVersion.bump, dentro de la misma transacción.
+    """
+    cache = _cache()
+    user_id = int(user_id)
+    if cache is None or user_id not in cache:
+        return
+    db.session.flush()  # Un Transaction recién añadido necesita su id
+    version = DataVersion.current(user_id, "transactions")
+    row = row_for(upsert) if upsert is not None else None
+    db.session.info.setdefault(PATCHES_KEY, []).append((cache, user_id, version, row, delete_id))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_patches(session):
+    for cache, user_id, version, row, delete_id in session.info.pop(PATCHES_KEY, ()):
+        # Parches idempotentes: si la entrada ya incluía el cambio (se cargó tras la escritura) no se duplica
+        cache.patch(user_id, version, lambda columns: columns.upsert(row) if row else columns.without(delete_id))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_patches(session):
+    session.info.pop(PATCHES_KEY, None)
+
+
+def setup_transaction_cache(app):
+    app.config.setdefault('TRANSACTION_CACHE_MB', float(os.getenv("TRANSACTION_CACHE_MB", 64)))
+    if app.config['TRANSACTION_CACHE_MB'] > 0:
+        app.extensions["transaction_cache"] = TransactionCache(int(app.config['TRANSACTION_CACHE_MB'] * 1024 * 1024))
@@ -1,4 +1,14 @@
-from flask import jsonify, url_for
+from flask import jsonify, url_for, request, current_app, make_response
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+from datetime import datetime
+import base64
+import hashlib
+import json
+from sqlalchemy import tuple_ as db_tuple, select, update, delete
+from types import SimpleNamespace
+from api.serializers import SERIALIZED_COLUMNS, projected_columns, serialize_rows, json_response
+from api.models import db, DataVersion
 
 class APIException(Exception):
     status_code = 400
@@ -15,13 +25,190 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def parse_date(value, field=None):
+    """Convierte una fecha 'YYYY-MM-DD' en datetime; si no es válida responde 400 nombrando el campo."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        where = f" para {field}" if field else ""
+        raise APIException(f"Formato de fecha inválido{where}. Debe ser 'YYYY-MM-DD'", status_code=400)
+
+def parse_date_range(args):
+    """Lee start_date y end_date (opcionales) de `args`. Devuelve (start, end), con None si faltan."""
+    return tuple(parse_date(args[field], field) if args.get(field) else None for field in ("start_date", "end_date"))
+
+def encode_cursor(values):
+    """Codifica los valores de la última fila de una página en un cursor opaco."""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, keys):
+    """Decodifica un cursor generado por encode_cursor para las columnas `keys`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(keys):
+            raise ValueError
+        values = []
+        for key, value in zip(keys, raw):
+            if key.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, int):
+                raise ValueError
+            values.append(value)
+        return values
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise APIException("Cursor inválido", status_code=400)
+
+def parse_limit():
+    """Devuelve el `limit` pedido (acotado a API_MAX_PAGE_SIZE) o None si no se pidió paginación."""
+    limit = request.args.get('limit')
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise APIException("El parámetro limit debe ser un entero", status_code=400)
+    if limit < 1:
+        raise APIException("El parámetro limit debe ser mayor que 0", status_code=400)
+    return min(limit, current_app.config.get('API_MAX_PAGE_SIZE', 500))
+
+def paginate(query, keys):
+    """
+    Paginación por cursor (keyset) sobre las columnas `keys`, p.ej. (Transaction.date, Transaction.id).
+    Solo se seleccionan las columnas de serialize() del modelo, sin instanciar objetos del ORM.
+    Con ?limit y/o ?cursor devuelve {"items": [...], "next_cursor": ...}. Sin ellos devuelve la lista
+    de siempre, cortada en API_UNPAGINATED_ROW_CAP filas; si hay más, el cursor para continuar
+    va en la cabecera X-Next-Cursor.
+    """
+    limit = parse_limit()
+    cursor = request.args.get('cursor')
+    paginated = limit is not None or cursor is not None
+    if limit is None:
+        limit = current_app.config.get('API_MAX_PAGE_SIZE', 500) if paginated else current_app.config.get('API_UNPAGINATED_ROW_CAP', 10000)
+
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.filter(db_tuple(*keys) > tuple(values))
+
+    model = keys[0].class_
+    rows = query.with_entities(*projected_columns(model)).order_by(*keys).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, key.key) for key in keys])
+
+    items = serialize_rows(model, rows)
+    if paginated:
+        return json_response({"items": items, "next_cursor": next_cursor}), 200
+    response = json_response(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+def owned_update(model, row_id, user_id, values, previous=()):
+    """
+    UPDATE ... WHERE id = :id AND user_id = :uid RETURNING <columnas de serialize()> en una sola sentencia.
+    Con `previous` devuelve además los valores anteriores de esas columnas (en Postgres en la misma
+    sentencia, mediante un CTE con FOR UPDATE). Devuelve (fila, anteriores) o (None, None) si no hay fila.
+    """
+    table = model.__table__
+    owned = (table.c.id == row_id, table.c.user_id == int(user_id))
+    returning = [table.c[name] for name in SERIALIZED_COLUMNS[model]]
+    values = values or {"id": table.c.id}
+
+    if previous and db.session.get_bind().dialect.name == "postgresql":
+        old = select(table.c.id, *[table.c[name] for name in previous]).where(*owned).with_for_update().cte("previous")
+        statement = (update(table).where(table.c.id == old.c.id).values(**values)
+                     .returning(*returning, *[old.c[name].label(f"previous_{name}") for name in previous]))
+        row = db.session.execute(statement).first()
+        if row is None:
+            return None, None
+        return row, SimpleNamespace(**dict(zip(previous, row[len(returning):])))
+
+    old = None
+    if previous:
+        old = db.session.execute(select(*[table.c[name] for name in previous]).where(*owned).with_for_update()).first()
+        if old is None:
+            return None, None
+    row = db.session.execute(update(table).where(*owned).values(**values).returning(*returning)).first()
+    if row is None:
+        return None, None
+    return row, old
+
+def owned_delete(model, row_id, user_id, returning=("id",)):
+    """DELETE ... WHERE id = :id AND user_id = :uid RETURNING `returning`. Devuelve la fila borrada o None."""
+    table = model.__table__
+    statement = (delete(table).where(table.c.id == row_id, table.c.user_id == int(user_id))
+                 .returning(*[table.c[name] for name in returning]))
+    return db.session.execute(statement).first()
+
+def owned_bulk_update(model, user_id, conditions, values, returning=("id",), previous=()):
+    """
+    Versión por filtro de owned_update: UPDATE ... WHERE user_id = :uid AND <conditions> RETURNING `returning`
+    (que debe empezar por "id") en una sola sentencia. Con `previous` devuelve además los valores
+    anteriores de esas columnas. Devuelve una lista de (fila, anteriores).
+    """
+    table = model.__table__
+    owned = (table.c.user_id == int(user_id), *conditions)
+    returning = [table.c[name] for name in returning]
+
+    if previous and db.session.get_bind().dialect.name == "postgresql":
+        old = select(table.c.id, *[table.c[name] for name in previous]).where(*owned).with_for_update().cte("previous")
+        statement = (update(table).where(table.c.id == old.c.id).values(**values)
+                     .returning(*returning, *[old.c[name].label(f"previous_{name}") for name in previous]))
+        return [(row, SimpleNamespace(**dict(zip(previous, row[len(returning):]))))
+                for row in db.session.execute(statement)]
+
+    old = {}
+    if previous:
+        statement = select(table.c.id, *[table.c[name] for name in previous]).where(*owned).with_for_update()
+        old = {row.id: row for row in db.session.execute(statement)}
+    rows = db.session.execute(update(table).where(*owned).values(**values).returning(*returning)).all()
+    return [(row, old.get(row.id)) for row in rows]
+
+def owned_bulk_delete(model, user_id, conditions, returning=("id",)):
+    """DELETE ... WHERE user_id = :uid AND <conditions> RETURNING `returning`. Devuelve las filas borradas."""
+    table = model.__table__
+    statement = (delete(table).where(table.c.user_id == int(user_id), *conditions)
+                 .returning(*[table.c[name] for name in returning]))
+    return db.session.execute(statement).all()
+
+def serialize_row(model, row):
+    return serialize_rows(model, [row[:len(SERIALIZED_COLUMNS[model])]])[0]
+
+def versioned(*resources, vary=None):
+    """
+    ETag para listados a partir de la versión de datos (DataVersion) del usuario para `resources`.
+    Si el cliente envía un If-None-Match que coincide se responde 304 sin consultar la tabla principal.
+    `vary` (opcional) devuelve un texto más para el ETag, para vistas que dependen de algo además de
+    los datos (p.ej. la fecha de hoy).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = get_jwt_identity()
+            version = ".".join(str(DataVersion.current(user_id, resource)) for resource in resources)
+            extra = vary() if vary else ""
+            etag = hashlib.sha1(f"{','.join(resources)}:{user_id}:{version}:{extra}:{request.query_string.decode()}".encode()).hexdigest()
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
     return len(defaults) >= len(arguments)
 
 def generate_sitemap(app):
-    links = ['/admin/']
+    links = ['/admin/'] if 'admin' in app.blueprints else []
     for rule in app.url_map.iter_rules():
         # Filter out rules we can't navigate to in a browser
         # and rules that require parameters
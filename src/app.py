@@ -3,72 +3,99 @@ This module takes care of starting the API Server, Loading the DB and Adding the
 """
 import os
 import logging
-from flask import Flask, jsonify, send_from_directory
-from flask_migrate import Migrate
+from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from config import PROFILES, default_profile
 from api.models import db
+from api.db_routing import setup_read_replicas
 from api.routes import api
-from api.admin import setup_admin
 from api.commands import setup_commands
+from api.quickchart import setup_quickchart
+from api.passwords import setup_passwords
+from api.metrics import setup_metrics
+from api.transaction_cache import setup_transaction_cache
+from api.static_files import setup_static_files
+from api.jobs import setup_jobs
 from api.utils import APIException, generate_sitemap
 
-# Crear instancia de Flask
-app = Flask(__name__)
-app.url_map.strict_slashes = False
+static_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../public/')
 
-# Configuración JWT
-app.config['JWT_SECRET_KEY'] = 'JuanrRuProject'
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
-jwt = JWTManager(app)
+jwt = JWTManager()
 
-# Configuración de CORS
-CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-# Configuración del entorno
-ENV = "development" if os.getenv("FLASK_DEBUG") == "1" else "production"
-static_file_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../public/')
+def create_app(config=None, **overrides):
+    """
+    Crea la aplicación con el perfil `config` ("production", "development", "test" o una clase de
+    configuración; por defecto según APP_ENV/FLASK_DEBUG). `overrides` se aplica encima del perfil.
+    """
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
+    app.config.from_object(PROFILES[config or default_profile()] if not isinstance(config, type) else config)
+    app.config.update(overrides)
+
+    # Logging
+    logging.basicConfig(level=app.config['LOG_LEVEL'])
+    logging.getLogger().setLevel(app.config['LOG_LEVEL'])
+
+    # Configuración JWT
+    if not app.config.get('JWT_SECRET_KEY'):
+        # Con el secreto antiguo del repositorio cualquiera podría firmar tokens válidos
+        raise RuntimeError("JWT_SECRET_KEY es obligatorio en producción")
+    jwt.init_app(app)
+
+    # Configuración de CORS
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+    # Límite de duración de las sentencias en Postgres (también en las réplicas)
+    statement_timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if statement_timeout and app.config['SQLALCHEMY_DATABASE_URI'].startswith("postgresql"):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+            "connect_args": {"options": f"-c statement_timeout={statement_timeout}"},
+        }
+
+    # Réplicas de lectura (DATABASE_REPLICA_URLS) e inicialización de la base de datos
+    setup_read_replicas(app)
+    db.init_app(app)
+    if app.config['MIGRATIONS_ENABLED']:
+        from flask_migrate import Migrate  # Importar alembic cuesta ~0.4 s y el servidor web no lo necesita
+        Migrate(app, db, compare_type=True)
+
+    # Registro de Blueprints y configuraciones
+    if app.config['ADMIN_ENABLED']:
+        from api.admin import setup_admin  # Flask-Admin solo se importa si se usa
+        setup_admin(app)
+    setup_commands(app)
+    setup_quickchart(app)
+    setup_passwords(app)
+    setup_metrics(app)
+    setup_transaction_cache(app)
+    setup_jobs(app)
+    static_files = setup_static_files(app, static_file_dir)
+    app.register_blueprint(api, url_prefix='/api')
+
+    # Manejo de errores
+    @app.errorhandler(APIException)
+    def handle_api_exception(error):
+        return jsonify(error.to_dict()), error.status_code
+
+    # Sitemap para desarrollo
+    @app.route('/')
+    def sitemap():
+        if app.config['SITEMAP_ENABLED']:
+            return generate_sitemap(app)
+        return static_files.serve('index.html')
+
+    # Servir archivos estáticos (índice de public/ construido al arrancar)
+    @app.route('/<path:path>', methods=['GET'])
+    def serve_any_other_file(path):
+        return static_files.serve(path)
+
+    return app
 
-# Logging
-logging.basicConfig(level=logging.DEBUG)
-
-# Configuración de la base de datos
-db_url = os.getenv("DATABASE_URL")
-if db_url:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-MIGRATE = Migrate(app, db, compare_type=True)
-
-# Registro de Blueprints y configuraciones
-setup_admin(app)
-setup_commands(app)
-app.register_blueprint(api, url_prefix='/api')
-
-# Manejo de errores
-@app.errorhandler(APIException)
-def handle_api_exception(error):
-    return jsonify(error.to_dict()), error.status_code
-
-# Sitemap para desarrollo
-@app.route('/')
-def sitemap():
-    if ENV == "development":
-        return generate_sitemap(app)
-    return send_from_directory(static_file_dir, 'index.html')
-
-# Servir archivos estáticos
-@app.route('/<path:path>', methods=['GET'])
-def serve_any_other_file(path):
-    if not os.path.isfile(os.path.join(static_file_dir, path)):
-        path = 'index.html'
-    response = send_from_directory(static_file_dir, path)
-    response.cache_control.max_age = 0
-    return response
 
 # Punto de entrada
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 3001))
-    app.run(host='0.0.0.0', port=PORT, debug=True)
+    create_app().run(host='0.0.0.0', port=PORT, debug=True)
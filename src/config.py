@@ -0,0 +1,99 @@
+"""
+Perfiles de configuración para create_app: production (por defecto), development y test.
+El perfil se elige con APP_ENV o, si no está definido, con FLASK_DEBUG=1 -> development.
+Los módulos de api/ completan el resto de claves con app.config.setdefault, así que un perfil
+puede sobrescribir cualquiera de ellas.
+"""
+import os
+
+LEGACY_JWT_SECRET = 'JuanrRuProject'
+
+
+def _flag(name, default):
+    return os.getenv(name, "1" if default else "0").lower() in ("1", "true", "yes")
+
+
+def _database_url(default):
+    return os.getenv("DATABASE_URL", default).replace("postgres://", "postgresql://")
+
+
+def _engine_options(url):
+    """
+    Opciones del pool de SQLAlchemy (también para las réplicas). En SQLite no aplican: usa su propio
+    pool por hilo. El statement_timeout de Postgres lo añade create_app con DB_STATEMENT_TIMEOUT_MS.
+    """
+    if url.startswith("sqlite"):
+        return {}
+    options = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        # Detecta conexiones cortadas por el proveedor antes de usarlas, a costa de un SELECT 1
+        "pool_pre_ping": _flag("DB_POOL_PRE_PING", True),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    }
+    return options
+
+
+class Config:
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JWT_ACCESS_TOKEN_EXPIRES = False
+    # Comandos `flask db`; wsgi.py los desactiva porque gunicorn no los usa
+    MIGRATIONS_ENABLED = True
+    # statement_timeout de Postgres en ms; 0 = sin límite. Solo lo activa wsgi.py (servidor web): las
+    # migraciones, `flask worker` y los comandos hacen sentencias largas legítimas (índices, rollups, COPY)
+    DB_STATEMENT_TIMEOUT_MS = 0
+
+    # Paginación de los listados
+    API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 500))
+    API_UNPAGINATED_ROW_CAP = int(os.getenv("API_UNPAGINATED_ROW_CAP", 10000))
+    # Importación masiva de transacciones
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 5000))
+    IMPORT_MAX_BATCH_SIZE = int(os.getenv("IMPORT_MAX_BATCH_SIZE", 20000))
+    # Endpoint /api/batch
+    BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", 500))
+    # Ids admitidos en el filtro de las operaciones masivas (PATCH/DELETE de listados, /api/payments/settle).
+    # Antes se llamaba SETTLE_MAX_IDS; se sigue leyendo si el nuevo nombre no está definido
+    BULK_MAX_IDS = int(os.getenv("BULK_MAX_IDS", os.getenv("SETTLE_MAX_IDS", 10000)))
+
+
+class ProductionConfig(Config):
+    SQLALCHEMY_DATABASE_URI = _database_url("sqlite:////tmp/test.db")
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")  # Obligatorio: create_app falla si no está definido
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    ADMIN_ENABLED = _flag("ADMIN_ENABLED", False)
+    SITEMAP_ENABLED = False
+
+
+class DevelopmentConfig(Config):
+    SQLALCHEMY_DATABASE_URI = _database_url("sqlite:////tmp/test.db")
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", LEGACY_JWT_SECRET)  # Solo en desarrollo: el secreto es público
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+    ADMIN_ENABLED = _flag("ADMIN_ENABLED", True)
+    SITEMAP_ENABLED = True
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = _database_url("sqlite://")
+    JWT_SECRET_KEY = "test-secret"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
+    ADMIN_ENABLED = False
+    SITEMAP_ENABLED = False
+    # Hash barato y en el propio proceso: los tests no necesitan el pool ni el coste de scrypt
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    PASSWORD_HASH_WORKERS = 0
+    CHART_RENDERER = "local"
+
+
+PROFILES = {
+    "production": ProductionConfig,
+    "development": DevelopmentConfig,
+    "test": TestConfig,
+}
+
+
+def default_profile():
+    return os.getenv("APP_ENV") or ("development" if os.getenv("FLASK_DEBUG") == "1" else "production")
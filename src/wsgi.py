@@ -1,7 +1,11 @@
 # This file was created to run the application on heroku using gunicorn.
 # Read more about it here: https://devcenter.heroku.com/articles/python-gunicorn
 
-from app import app as application
+import os
+from app import create_app
+
+application = create_app(MIGRATIONS_ENABLED=False,
+                         DB_STATEMENT_TIMEOUT_MS=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000)))
 
 if __name__ == "__main__":
     application.run()
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app import create_app  # noqa: E402
+from api.models import db, User  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    # SQLite en memoria aunque haya un DATABASE_URL en el entorno
+    app = create_app("test", SQLALCHEMY_DATABASE_URI="sqlite://")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Registra un usuario y devuelve sus cabeceras de autorización."""
+    def register(email="a@example.com"):
+        client.post("/api/register", json={"name": "A", "company": "C", "email": email, "password": "pw"})
+        response = client.post("/api/login", json={"email": email, "password": "pw"})
+        return {"Authorization": "Bearer " + response.json["token"]}
+    return register
+
+
+@pytest.fixture
+def auth(register):
+    return register()
+
+
+@pytest.fixture
+def user(auth):
+    return User.query.filter_by(email="a@example.com").one()
@@ -0,0 +1,64 @@
+import pytest
+
+from api.models import Project, Budget, Transaction
+from api.batch import run_batch
+from api.utils import APIException
+
+
+def create_project(data=None):
+    return {"op": "create", "model": "project",
+            "data": {"name": "P", "description": "D", "client": "C", **(data or {})}}
+
+
+def create_budget(project_id, amount=100):
+    return {"op": "create", "model": "budget", "data": {"project_id": project_id, "amount": amount, "status": "draft"}}
+
+
+def batch_error(operations, user_id):
+    with pytest.raises(APIException) as error:
+        run_batch(operations, user_id, 500)
+    return error.value
+
+
+def test_budget_references_project_created_in_the_same_batch(user):
+    results = run_batch([create_project(), create_budget("$0"), create_budget("$0", 50)], user.id, 500)
+    project = Project.query.one()
+    assert [r["status"] for r in results] == [201, 201, 201]
+    assert [b.project_id for b in Budget.query.order_by(Budget.id)] == [project.id, project.id]
+    assert results[1]["data"]["project_id"] == project.id
+
+
+def test_reference_to_a_later_operation_is_rejected(user):
+    error = batch_error([create_budget("$1"), create_project()], user.id)
+    assert error.status_code == 400 and error.payload == {"operation": 0}
+    assert Project.query.count() == 0
+
+
+@pytest.mark.parametrize("reference", ["$1", "$9", "$x"])
+def test_reference_must_point_to_a_created_project(user, reference):
+    operations = [create_project(), {"op": "create", "model": "transaction",
+                                     "data": {"amount": 5, "transaction_type": "income", "status": "completed"}},
+                  create_budget(reference)]
+    error = batch_error(operations, user.id)
+    assert error.status_code == 400 and error.payload == {"operation": 2}
+    # Todo el lote se deshace
+    assert Project.query.count() == 0 and Transaction.query.count() == 0
+
+
+def test_plain_project_id_must_belong_to_the_user(user, client, register):
+    other = register("b@example.com")
+    foreign = client.post("/api/projects", headers=other, json={"name": "X", "description": "Y", "client": "Z"}).json
+    error = batch_error([create_budget(foreign["id"])], user.id)
+    assert error.status_code == 403
+
+    own = run_batch([create_project()], user.id, 500)[0]["data"]["id"]
+    results = run_batch([create_budget(str(own))], user.id, 500)
+    assert results[0]["data"]["project_id"] == own
+
+
+def test_batch_endpoint_reports_failing_operation(client, auth):
+    response = client.post("/api/batch", headers=auth, json={"operations": [
+        create_project(), create_budget("$0", amount="mucho")]})
+    assert response.status_code == 400
+    assert response.json["operation"] == 1
+    assert client.get("/api/projects", headers=auth).json == []
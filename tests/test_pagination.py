@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from api.models import Transaction
+from api.utils import APIException, encode_cursor, decode_cursor
+
+KEYS = (Transaction.date, Transaction.id)
+
+
+def create_transactions(client, auth, count):
+    for i in range(count):
+        response = client.post("/api/transactions", headers=auth, json={
+            "amount": i + 1, "transaction_type": "income", "status": "completed", "description": f"t{i}",
+        })
+        assert response.status_code == 201
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30, 15, 250), 42]
+    assert decode_cursor(encode_cursor(values), KEYS) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "no-es-base64!",
+    encode_cursor([1]),                         # le falta una columna
+    encode_cursor(["2024-05-01T00:00:00", "7"]),  # id que no es entero
+    encode_cursor(["ayer", 7]),                 # fecha inválida
+])
+def test_decode_cursor_rejects_invalid_cursors(cursor):
+    with pytest.raises(APIException) as error:
+        decode_cursor(cursor, KEYS)
+    assert error.value.status_code == 400
+
+
+def test_pages_cover_every_row_once_in_order(client, auth):
+    create_transactions(client, auth, 5)
+
+    ids, cursor = [], None
+    while True:
+        url = "/api/transactions?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=auth)
+        assert response.status_code == 200
+        page = response.json
+        assert len(page["items"]) <= 2
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = [row.id for row in Transaction.query.order_by(Transaction.date, Transaction.id)]
+    assert ids == expected and len(ids) == 5
+
+
+def test_unpaginated_list_is_capped_with_next_cursor_header(app, client, auth):
+    create_transactions(client, auth, 3)
+    app.config["API_UNPAGINATED_ROW_CAP"] = 2
+
+    response = client.get("/api/transactions", headers=auth)
+    assert isinstance(response.json, list) and len(response.json) == 2
+
+    rest = client.get(f"/api/transactions?cursor={response.headers['X-Next-Cursor']}", headers=auth)
+    assert [item["id"] for item in rest.json["items"]] == [3]
+    assert rest.json["next_cursor"] is None
+
+
+def test_limit_and_cursor_validation(client, auth):
+    assert client.get("/api/transactions?limit=0", headers=auth).status_code == 400
+    assert client.get("/api/transactions?limit=abc", headers=auth).status_code == 400
+    assert client.get("/api/transactions?cursor=basura", headers=auth).status_code == 400
@@ -0,0 +1,86 @@
+from datetime import datetime, date
+from types import SimpleNamespace
+
+from api.models import db, Transaction, TransactionRollup
+
+
+def buckets():
+    return {(r.period, r.transaction_type, r.status): (r.amount, r.count)
+            for r in TransactionRollup.query.order_by(TransactionRollup.period) if r.count}
+
+
+def rebuilt():
+    """Totales recalculados desde cero, para comparar con los mantenidos incrementalmente."""
+    TransactionRollup.rebuild()
+    return buckets()
+
+
+def new_transaction(user, amount, when, transaction_type="income", status="completed"):
+    transaction = Transaction(user_id=user.id, amount=amount, description="", transaction_type=transaction_type,
+                              status=status, date=when)
+    db.session.add(transaction)
+    TransactionRollup.add(transaction)
+    db.session.flush()
+    return transaction
+
+
+def test_add_accumulates_into_the_month_bucket(user):
+    new_transaction(user, 10, datetime(2024, 3, 5))
+    new_transaction(user, 5.5, datetime(2024, 3, 31, 23, 59))
+    new_transaction(user, 7, datetime(2024, 4, 1))
+    assert buckets() == {
+        (date(2024, 3, 1), "income", "completed"): (15.5, 2),
+        (date(2024, 4, 1), "income", "completed"): (7.0, 1),
+    }
+
+
+def test_move_changes_bucket_and_amount(user):
+    transaction = new_transaction(user, 10, datetime(2024, 3, 5))
+    old_key, old_amount = TransactionRollup.key_for(transaction), transaction.amount
+    transaction.amount, transaction.status, transaction.date = 25, "pending", datetime(2024, 5, 2)
+    TransactionRollup.move(old_key, old_amount, transaction)
+    assert buckets() == {(date(2024, 5, 1), "income", "pending"): (25.0, 1)}
+
+
+def test_move_within_the_same_bucket_only_changes_the_amount(user):
+    transaction = new_transaction(user, 10, datetime(2024, 3, 5))
+    old_key, old_amount = TransactionRollup.key_for(transaction), transaction.amount
+    transaction.amount, transaction.date = 4, datetime(2024, 3, 20)
+    TransactionRollup.move(old_key, old_amount, transaction)
+    assert buckets() == {(date(2024, 3, 1), "income", "completed"): (4.0, 1)}
+
+
+def test_remove_empties_the_bucket(user):
+    keep = new_transaction(user, 3, datetime(2024, 3, 1))
+    gone = new_transaction(user, 10, datetime(2024, 3, 5))
+    TransactionRollup.remove(gone)
+    db.session.delete(gone)
+    assert buckets() == {(date(2024, 3, 1), "income", "completed"): (float(keep.amount), 1)}
+
+
+def test_apply_rows_groups_by_bucket(user):
+    rows = [SimpleNamespace(user_id=user.id, amount=amount, date=when, transaction_type="expense", status="pending")
+            for amount, when in ((1, datetime(2024, 1, 2)), (2, datetime(2024, 1, 9)), (4, datetime(2024, 2, 1)))]
+    TransactionRollup.apply_rows(added=rows)
+    TransactionRollup.apply_rows(removed=rows[:1])
+    assert buckets() == {
+        (date(2024, 1, 1), "expense", "pending"): (2.0, 1),
+        (date(2024, 2, 1), "expense", "pending"): (4.0, 1),
+    }
+
+
+def test_api_writes_keep_rollups_in_sync(client, auth):
+    for amount, transaction_type in ((100, "income"), (40, "expense"), (60, "income")):
+        response = client.post("/api/transactions", headers=auth, json={
+            "amount": amount, "transaction_type": transaction_type, "status": "completed"})
+        assert response.status_code == 201
+    first, second, third = [t["id"] for t in client.get("/api/transactions", headers=auth).json]
+
+    assert client.put(f"/api/transactions/{first}", headers=auth,
+                      json={"amount": 80, "date": "2023-12-24"}).status_code == 200
+    assert client.put(f"/api/transactions/{second}", headers=auth, json={"status": "pending"}).status_code == 200
+    assert client.delete(f"/api/transactions/{third}", headers=auth).status_code == 200
+
+    incremental = buckets()
+    assert incremental == rebuilt()
+    assert incremental[(date(2023, 12, 1), "income", "completed")] == (80.0, 1)
@@ -0,0 +1,46 @@
+from api.models import DataVersion
+
+
+def create_transaction(client, auth, amount=10):
+    return client.post("/api/transactions", headers=auth, json={
+        "amount": amount, "transaction_type": "income", "status": "completed",
+    })
+
+
+def test_matching_etag_returns_304(client, auth):
+    create_transaction(client, auth)
+    first = client.get("/api/transactions", headers=auth)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get("/api/transactions", headers={**auth, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_writes_change_the_etag(client, auth, user):
+    first = client.get("/api/transactions", headers=auth)
+    create_transaction(client, auth)
+    assert DataVersion.current(user.id, "transactions") == 1
+
+    second = client.get("/api/transactions", headers={**auth, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert len(second.json) == 1
+
+
+def test_etag_depends_on_query_string_and_user(client, auth, register):
+    other = register("b@example.com")
+    etags = {
+        client.get("/api/transactions", headers=auth).headers["ETag"],
+        client.get("/api/transactions?limit=1", headers=auth).headers["ETag"],
+        client.get("/api/transactions", headers=other).headers["ETag"],
+    }
+    assert len(etags) == 3
+
+
+def test_other_resources_do_not_invalidate(client, auth):
+    first = client.get("/api/transactions", headers=auth)
+    client.post("/api/employees", headers=auth, json={"name": "E", "salary": 1000})
+    again = client.get("/api/transactions", headers={**auth, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
@@ -4,7 +4,9 @@ const Dotenv = require('dotenv-webpack');
 module.exports = merge(common, {
     mode: 'production',
     output: {
-        publicPath: '/'
+        filename: '[name].[contenthash].js',
+        publicPath: '/',
+        clean: true // borra los bundles de builds anteriores antes de emitir los nuevos
     },
     plugins: [
         new Dotenv({